@@ -1,11 +1,22 @@
+import os
 import streamlit as st
-import joblib
 import pandas as pd
 from datetime import datetime
 import plotly.express as px
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from inference_backends import get_backend
+from micro_batching import maybe_micro_batched
+from artifact_watcher import maybe_hot_reloading
+from profiling import requested_mode, Profiler, profiled
+from neighbor_index import load_index, StaleIndexError
+from counterfactual import search as counterfactual_search
+from form_options import (
+    SEX_OPTIONS, AGE_CATEGORY_OPTIONS, STATES_BY_REGION, GENERAL_HEALTH_OPTIONS, YES_NO_OPTIONS,
+    SMOKER_OPTIONS, REMOVED_TEETH_OPTIONS, WEIGHT_LIMITS, HEIGHT_LIMITS, SLEEP_HOURS_LIMITS,
+    HEALTH_DAYS_LIMITS
+)
 
 # --- Configuration ---
 st.set_page_config(
@@ -20,14 +31,53 @@ st.set_page_config(
     }
 )
 
-# Load model and preprocessor with caching
+# Opt-in profiling (see profiling.py): HEARTGUARD_PROFILE=rerun|predict, or
+# ?admin=<HEARTGUARD_PROFILE_TOKEN>&profile=rerun|predict for one session
+profile_mode = requested_mode(st.query_params)
+# A previous rerun cut short by Streamlit (widget changed mid-run) never reached
+# its stop() at the end of this script; drop its profiler before starting anew
+stale_profiler = st.session_state.pop("rerun_profiler", None)
+if stale_profiler is not None:
+    stale_profiler.abandon()
+rerun_profiler = Profiler("rerun", "App.py").start() if profile_mode == "rerun" else None
+if rerun_profiler is not None:
+    st.session_state["rerun_profiler"] = rerun_profiler
+
+def show_profile(summary, container=st):
+    with container.expander(f"⏱ Profile {summary['request_id']} ({summary['wall_ms']:.1f} ms)"):
+        st.json(summary["stage_ms"])
+        st.dataframe(pd.DataFrame(summary["top_functions"]), use_container_width=True, hide_index=True)
+
+# Load the prediction backend (HEARTGUARD_BACKEND=sklearn|onnx|pool) with caching.
+# With HEARTGUARD_MICROBATCH_MS set, predictions from all sessions are batched; with
+# HEARTGUARD_HOT_RELOAD_S set, newly deployed artifacts are swapped in without a restart.
 @st.cache_resource
 def load_assets():
-    model = joblib.load("model.pkl")
-    preprocessor = joblib.load("preprocessor.pkl")
-    return model, preprocessor
+    return maybe_micro_batched(maybe_hot_reloading(get_backend("onehot")))
+
+backend = load_assets()
+# Read before the model, so a swap in between can't file a new model under an old version
+artifact_version = getattr(backend, "version", None)
+# Only the sklearn backend exposes these (used for the feature importance chart)
+model, preprocessor = backend.model, backend.preprocessor
+
+# Similar-profile index (built offline with neighbor_index.py build); None if
+# it is missing or was built for other model artifacts. The onnx and pool
+# backends keep no model in this process, so the section is skipped for them.
+# Cached per artifact version, so a hot-reloaded model is checked against the
+# index again (and the section hidden if the index is for the old one).
+@st.cache_resource
+def load_neighbors(version, _model, _preprocessor, _checksums):
+    if _model is None:
+        return None
+    fingerprint = _checksums and {os.path.basename(path): sha for path, sha in _checksums.items()}
+    try:
+        return load_index(model=_model, preprocessor=_preprocessor, fingerprint=fingerprint)
+    except (FileNotFoundError, StaleIndexError):
+        return None
 
-model, preprocessor = load_assets()
+neighbors = load_neighbors(artifact_version, model, preprocessor,
+                           backend.checksums(artifact_version) if artifact_version else None)
 
 # --- Modern CSS Styling with Glassmorphism Effect ---
 st.markdown("""
@@ -309,6 +359,21 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# --- Prediction batching metrics (open the app with ?metrics=1) ---
+if hasattr(backend, "metrics") and st.query_params.get("metrics") == "1":
+    st.sidebar.markdown("### ⏱ Prediction Batching")
+    st.sidebar.json(backend.metrics())
+
+# --- Artifact version and hot reload history (same ?metrics=1) ---
+if hasattr(backend, "status") and st.query_params.get("metrics") == "1":
+    st.sidebar.markdown("### 📦 Model Version")
+    st.sidebar.json(backend.status())
+
+# --- Profile of the previous rerun (saved at the end of each profiled rerun) ---
+if profile_mode == "rerun" and st.session_state.get("last_rerun_profile"):
+    st.sidebar.markdown("### ⏱ Last Rerun Profile")
+    show_profile(st.session_state["last_rerun_profile"], st.sidebar)
+
 # --- App Container ---
 with st.container():
     st.markdown('<div class="main">', unsafe_allow_html=True)
@@ -339,35 +404,17 @@ with st.container():
 
             with col1:
                 st.markdown("### 👤 Personal Information")
-                sex = st.selectbox("Sex", ["Male", "Female", "Other"])
-                age_category = st.selectbox("Age Category", [
-                    "18-24", "25-29", "30-34", "35-39", "40-44", "45-49",
-                    "50-54", "55-59", "60-64", "65-69", "70-74", "75-79", "80+"
-                ], help="Select your age range")
+                sex = st.selectbox("Sex", SEX_OPTIONS)
+                age_category = st.selectbox("Age Category", AGE_CATEGORY_OPTIONS, help="Select your age range")
                 
                 # Enhanced state selector with region grouping
-                states_by_region = {
-                    "Northeast": ["Connecticut", "Maine", "Massachusetts", "New Hampshire", 
-                                  "Rhode Island", "Vermont", "New Jersey", "New York", "Pennsylvania"],
-                    "Midwest": ["Illinois", "Indiana", "Michigan", "Ohio", "Wisconsin", 
-                               "Iowa", "Kansas", "Minnesota", "Missouri", "Nebraska", 
-                               "North Dakota", "South Dakota"],
-                    "South": ["Delaware", "Florida", "Georgia", "Maryland", "North Carolina", 
-                             "South Carolina", "Virginia", "West Virginia", "Alabama", 
-                             "Kentucky", "Mississippi", "Tennessee", "Arkansas", 
-                             "Louisiana", "Oklahoma", "Texas"],
-                    "West": ["Arizona", "Colorado", "Idaho", "Montana", "Nevada", 
-                            "New Mexico", "Utah", "Wyoming", "Alaska", "California", 
-                            "Hawaii", "Oregon", "Washington"]
-                }
-                
-                region = st.selectbox("Region", list(states_by_region.keys()))
-                state = st.selectbox("State", states_by_region[region])
+                region = st.selectbox("Region", list(STATES_BY_REGION.keys()))
+                state = st.selectbox("State", STATES_BY_REGION[region])
 
                 st.markdown("### ⚖ Physical Metrics")
-                weight = st.number_input("Weight (kg)", 30.0, 200.0, step=0.5, value=70.0, 
+                weight = st.number_input("Weight (kg)", *WEIGHT_LIMITS, step=0.5, value=70.0, 
                                        help="Enter your weight in kilograms")
-                height = st.number_input("Height (m)", 1.0, 2.5, step=0.01, value=1.75, 
+                height = st.number_input("Height (m)", *HEIGHT_LIMITS, step=0.01, value=1.75, 
                                       help="Enter your height in meters")
                 
                 # Enhanced BMI Calculation with visual indicator
@@ -420,30 +467,30 @@ with st.container():
 
             with col2:
                 st.markdown("### 🏥 Health History")
-                general_health = st.selectbox("General Health", ["Poor", "Fair", "Good", "Very good", "Excellent"],
+                general_health = st.selectbox("General Health", GENERAL_HEALTH_OPTIONS,
                                             help="How would you rate your general health?")
-                had_stroke = st.selectbox("Had Stroke", ["Yes", "No"], 
+                had_stroke = st.selectbox("Had Stroke", YES_NO_OPTIONS, 
                                          help="Have you ever been told you had a stroke?")
-                had_angina = st.selectbox("Had Angina", ["Yes", "No"], 
+                had_angina = st.selectbox("Had Angina", YES_NO_OPTIONS, 
                                          help="Have you ever been told you had angina or coronary artery disease?")
-                smoker = st.selectbox("Smoker Status", ["Never smoked", "Former smoker", "Current smoker"],
+                smoker = st.selectbox("Smoker Status", SMOKER_OPTIONS,
                                      help="Select your smoking status")
-                removed_teeth = st.selectbox("Removed Teeth", ["None", "1 to 5", "6 or more but not all", "All"],
+                removed_teeth = st.selectbox("Removed Teeth", REMOVED_TEETH_OPTIONS,
                                            help="How many permanent teeth have been removed due to tooth decay or gum disease?")
-                tetanus = st.selectbox("Tetanus Vaccine Last 10 Years", ["Yes", "No"],
+                tetanus = st.selectbox("Tetanus Vaccine Last 10 Years", YES_NO_OPTIONS,
                                      help="Have you had a tetanus shot in the last 10 years?")
 
                 st.markdown("### 🏃 Lifestyle Factors")
-                sleep_hours = st.slider("Average Sleep Hours per Day", 0, 24, 7, 
+                sleep_hours = st.slider("Average Sleep Hours per Day", *SLEEP_HOURS_LIMITS, 7, 
                                       help="Recommended 7-9 hours for adults")
                 
                 # Enhanced sliders with visual indicators
-                physical_days = st.slider("Days with Physical Health Issues (Last 30 Days)", 0, 30, 5,
+                physical_days = st.slider("Days with Physical Health Issues (Last 30 Days)", *HEALTH_DAYS_LIMITS, 5,
                                         help="How many days during the past 30 days was your physical health not good?")
                 if physical_days > 10:
                     st.warning("Frequent physical health issues may indicate underlying conditions")
                 
-                mental_days = st.slider("Days with Mental Health Issues (Last 30 Days)", 0, 30, 3,
+                mental_days = st.slider("Days with Mental Health Issues (Last 30 Days)", *HEALTH_DAYS_LIMITS, 3,
                                       help="How many days during the past 30 days was your mental health not good?")
                 if mental_days > 10:
                     st.warning("Frequent mental health issues may impact cardiovascular health")
@@ -494,16 +541,18 @@ with st.container():
                         "State": state
                     }
 
-                    df_input = pd.DataFrame([input_dict])
-                    df_transformed = preprocessor.transform(df_input)
-                    prediction = model.predict(df_transformed)[0]
-                    
-                    # Get prediction probabilities if available
-                    try:
-                        probabilities = model.predict_proba(df_transformed)[0]
-                        risk_score = round(probabilities[1] * 100, 1)
-                    except:
-                        risk_score = 75 if prediction == "Yes" else 25
+                    with profiled(profile_mode, "predict", "App.py prediction") as prediction_profiler:
+                        df_input = pd.DataFrame([input_dict])
+                        prediction = backend.predict(df_input)[0]
+
+                        # Get prediction probabilities if available
+                        try:
+                            probabilities = backend.predict_proba(df_input)[0]
+                            risk_score = round(probabilities[1] * 100, 1)
+                        except:
+                            risk_score = 75 if prediction == "Yes" else 25
+                    if prediction_profiler is not None and prediction_profiler.summary:
+                        show_profile(prediction_profiler.summary)
 
                     st.markdown("---")
                     
@@ -579,6 +628,14 @@ with st.container():
                             </div>
                             """, unsafe_allow_html=True)
                     
+                    # People with similar profiles from the 2022 survey
+                    if neighbors is not None:
+                        similar, outcome_rate = neighbors.query(df_input, k=25)
+                        st.markdown("### 👥 People With Similar Profiles")
+                        st.markdown(f"Of the **{len(similar)}** most similar survey respondents, "
+                                    f"**{outcome_rate:.0%}** had a heart attack.")
+                        st.dataframe(similar, use_container_width=True, hide_index=True)
+
                     # Feature importance visualization
                     try:
                         if hasattr(model, 'feature_importances_'):
@@ -603,6 +660,23 @@ with st.container():
                     
                     # Enhanced recommendations with cards
                     st.markdown("### 💡 Personalized Recommendations")
+
+                    # Smallest changes the model says would lower this risk level
+                    if risk_score > 30:
+                        counterfactuals = counterfactual_search(backend, input_dict, budget_ms=500)
+                        for threshold, label in ((0.7, "out of the high risk range"), (0.3, "into the low risk range")):
+                            found = counterfactuals["solutions"][threshold]
+                            if not found:
+                                continue
+                            best = found[0]
+                            st.markdown(f"""
+                            <div class="recommendation-card">
+                                <div class="recommendation-card-title">
+                                    🎯 What would move you {label} (estimated risk {best["probability"] * 100:.1f}%)
+                                </div>
+                                <div>{"<br>".join(best["descriptions"])}</div>
+                            </div>
+                            """, unsafe_allow_html=True)
                     
                     recommendations = []
                     if bmi_status in ["Obese", "Overweight"]:
@@ -942,4 +1016,9 @@ with st.container():
     </div>
     """, unsafe_allow_html=True)
 
-    st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# --- Profiling: save this rerun's profile; it is shown on the next rerun ---
+if rerun_profiler is not None:
+    st.session_state.pop("rerun_profiler", None)
+    st.session_state["last_rerun_profile"] = rerun_profiler.stop()
@@ -1,30 +1,27 @@
+import time
+
 import streamlit as st
 import pandas as pd
-import joblib
 import numpy as np
 
-# Load the model, encoders, and feature names
-rf_model = joblib.load("best_heart_model.pkl")
-label_encoders = joblib.load("label_encoders_heart_attack.joblib")
-model_features = joblib.load("model_features.pkl")
+from form_options import SIDEBAR_NUMERIC_LIMITS
+from inference_backends import get_backend
+from micro_batching import maybe_micro_batched
+from artifact_watcher import maybe_hot_reloading
+from live_scoring import RowScorer, LatencyGuard, live_budget_ms, live_debounce_seconds, timed_risk
 
-def preprocess_input(inputs: dict):
-    input_df = pd.DataFrame([inputs])
+# Load the prediction backend (HEARTGUARD_BACKEND=sklearn|onnx|pool), encoders, and feature names
+# once per process. The backend label-encodes the raw inputs itself (pipelines.encode_labels);
+# the RowScorer is the low-latency path used by the live estimate. HEARTGUARD_HOT_RELOAD_S
+# swaps in newly deployed artifacts without a restart.
+@st.cache_resource
+def load_assets():
+    backend = maybe_micro_batched(maybe_hot_reloading(get_backend("label")))
+    return backend, RowScorer(backend)
 
-    # Process categorical data using label encoders
-    for col in model_features:
-        if col in label_encoders:
-            le = label_encoders[col]
-            val = input_df.at[0, col]
-            if val in le.classes_:
-                input_df.at[0, col] = le.transform([val])[0]
-            else:
-                input_df.at[0, col] = le.transform([le.classes_[0]])[0]
-        else:
-            input_df[col] = pd.to_numeric(input_df[col], errors='coerce')
-    
-    input_df = input_df[model_features]
-    return input_df
+backend, scorer = load_assets()
+label_encoders = backend.label_encoders
+model_features = backend.model_features
 
 def main():
     st.markdown("<h1 style='color:#a83279; text-align:center;'>Heart Attack Risk Prediction</h1>", unsafe_allow_html=True)
@@ -34,6 +31,13 @@ def main():
     # Sidebar Inputs
     st.sidebar.header("📋 Input Data")
 
+    # Live mode re-scores on every input change; a session whose predictions keep
+    # exceeding the latency budget falls back to the Predict button
+    guard = st.session_state.setdefault("live_guard", LatencyGuard(live_budget_ms()))
+    live = st.sidebar.toggle("Live risk estimate", value=not guard.tripped, disabled=guard.tripped,
+                             help="Update the risk estimate as you change the inputs")
+    live_slot = st.sidebar.empty()
+
     # Options for categorical fields
     Sex_options = list(label_encoders['Sex'].classes_)
     AgeCategory_options = list(label_encoders['AgeCategory'].classes_)
@@ -47,11 +51,11 @@ def main():
     inputs = {
         "Sex": st.sidebar.selectbox("Sex", Sex_options),
         "GeneralHealth": st.sidebar.selectbox("General Health", ['Excellent', 'Very good', 'Good', 'Fair', 'Poor']),
-        "PhysicalHealthDays": st.sidebar.slider("Physical health days (last 30)", 0, 30, 5),
-        "MentalHealthDays": st.sidebar.slider("Mental health days (last 30)", 0, 30, 5),
+        "PhysicalHealthDays": st.sidebar.slider("Physical health days (last 30)", *SIDEBAR_NUMERIC_LIMITS["PhysicalHealthDays"], 5),
+        "MentalHealthDays": st.sidebar.slider("Mental health days (last 30)", *SIDEBAR_NUMERIC_LIMITS["MentalHealthDays"], 5),
         "LastCheckupTime": st.sidebar.selectbox("Last Medical Checkup", LastCheckupTime_options),
         "PhysicalActivities": st.sidebar.selectbox("Do you engage in physical activity?", ['Yes', 'No']),
-        "SleepHours": st.sidebar.slider("Sleep Hours", 0.0, 24.0, 7.0),
+        "SleepHours": st.sidebar.slider("Sleep Hours", *SIDEBAR_NUMERIC_LIMITS["SleepHours"], 7.0),
         "RemovedTeeth": st.sidebar.selectbox("Have teeth been removed?", RemovedTeeth_options),
         "HadAngina": st.sidebar.selectbox("Had Angina?", ['Yes', 'No']),
         "HadStroke": st.sidebar.selectbox("Had Stroke?", ['Yes', 'No']),
@@ -73,9 +77,9 @@ def main():
         "ChestScan": st.sidebar.selectbox("Had Chest Scan?", ['Yes', 'No']),
         "RaceEthnicityCategory": st.sidebar.selectbox("Race/Ethnicity", RaceEthnicityCategory_options),
         "AgeCategory": st.sidebar.selectbox("Age Category", AgeCategory_options),
-        "HeightInMeters": st.sidebar.number_input("Height (in meters)", min_value=1.0, max_value=2.5, value=1.70),
-        "WeightInKilograms": st.sidebar.number_input("Weight (in kg)", min_value=30.0, max_value=250.0, value=70.0),
-        "BMI": st.sidebar.number_input("Body Mass Index (BMI)", min_value=10.0, max_value=60.0, value=25.0),
+        "HeightInMeters": st.sidebar.number_input("Height (in meters)", *SIDEBAR_NUMERIC_LIMITS["HeightInMeters"], value=1.70),
+        "WeightInKilograms": st.sidebar.number_input("Weight (in kg)", *SIDEBAR_NUMERIC_LIMITS["WeightInKilograms"], value=70.0),
+        "BMI": st.sidebar.number_input("Body Mass Index (BMI)", *SIDEBAR_NUMERIC_LIMITS["BMI"], value=25.0),
         "AlcoholDrinkers": st.sidebar.selectbox("Do you drink alcohol?", ['Yes', 'No']),
         "HIVTesting": st.sidebar.selectbox("Tested for HIV?", ['Yes', 'No']),
         "FluVaxLast12": st.sidebar.selectbox("Received flu vaccine in the last 12 months?", ['Yes', 'No']),
@@ -97,9 +101,33 @@ def main():
     for col in yes_no_cols:
         inputs[col] = 1 if inputs[col] == 'Yes' else 0
 
+    if live and not guard.tripped:
+        key = tuple(inputs.items())
+        cached = st.session_state.get("live_result")
+        if cached and cached[0] == key:
+            # Unchanged inputs (e.g. a Predict click) reuse the result without waiting
+            probability, prediction = cached[1]
+        else:
+            # Debounce: while inputs keep changing, Streamlit stops this run at the next
+            # st call and starts a new one, so only the settled inputs get scored
+            time.sleep(live_debounce_seconds())
+            live_slot.caption("Updating…")
+            probability, prediction, latency_ms = timed_risk(scorer, inputs)
+            st.session_state["live_result"] = (key, (probability, prediction))
+            guard.record(latency_ms)
+        with live_slot.container():
+            st.metric("Estimated risk", f"{probability:.1%}")
+            if prediction == 1:
+                st.error("High risk of heart attack")
+            else:
+                st.success("Low risk of heart attack")
+            st.caption(f"Median scoring time {guard.median_ms():.1f} ms")
+    elif guard.tripped:
+        live_slot.info(f"Live estimate paused: predictions took {guard.median_ms():.1f} ms, "
+                       f"over the {guard.budget_ms:g} ms budget. Use the Predict button.")
+
     if st.button("Predict"):
-        input_df = preprocess_input(inputs)
-        prediction = rf_model.predict(input_df)[0]
+        prediction = backend.predict(pd.DataFrame([inputs]))[0]
         result = "High risk of heart attack" if prediction == 1 else "Low risk of heart attack"
         st.markdown("---")
         st.markdown("### 💓 Prediction Result:") 
@@ -0,0 +1,334 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import pipelines
+from form_options import SIDEBAR_NUMERIC_LIMITS, random_profile
+from inference_backends import SklearnBackend
+
+# Hot reload of the sklearn artifacts without restarting the apps. A
+# background thread watches the deployed files; when a complete new version
+# shows up it is loaded, warmed and checked on a smoke batch next to the
+# running one, then swapped in. Requests already running finish on the
+# version they started with. A version that fails the checks is rejected,
+# and one that starts raising right after the swap is rolled back.
+#
+#   HEARTGUARD_HOT_RELOAD_S=5 streamlit run App.py
+#
+# Deploy by copying the new files in place, then publishing a manifest,
+# which is what marks the version as complete:
+#
+#   python artifact_watcher.py publish --kind onehot --version 2026-10-rf
+#   python artifact_watcher.py check --kind onehot
+#
+# Without a manifest the files are taken once they have stopped changing
+# for one poll interval.
+HOT_RELOAD_ENV = "HEARTGUARD_HOT_RELOAD_S"
+
+ARTIFACTS = {
+    "onehot": [pipelines.MODEL_PATH, pipelines.PREPROCESSOR_PATH],
+    "label": [pipelines.LABEL_MODEL_PATH, pipelines.LABEL_ENCODERS_PATH, pipelines.MODEL_FEATURES_PATH],
+}
+MANIFEST_PATHS = {"onehot": "model_manifest.json", "label": "label_model_manifest.json"}
+
+
+class ArtifactValidationError(RuntimeError):
+    pass
+
+
+# --- Versions ---
+def artifact_checksums(kind):
+    return {path: pipelines.file_sha256(path) for path in ARTIFACTS[kind]}
+
+
+def _stat_signature(kind):
+    signature = []
+    for path in ARTIFACTS[kind]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _combined_version(kind, checksums):
+    return hashlib.sha256("".join(checksums[path] for path in ARTIFACTS[kind]).encode()).hexdigest()[:12]
+
+
+def read_manifest(kind):
+    try:
+        with open(MANIFEST_PATHS[kind]) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def publish_manifest(kind, version=None):
+    """Record the current files as a complete version; written atomically."""
+    checksums = artifact_checksums(kind)
+    manifest = {
+        "version": version or _combined_version(kind, checksums),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "files": checksums,
+    }
+    tmp_path = MANIFEST_PATHS[kind] + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATHS[kind])
+    return manifest
+
+
+def current_version(kind):
+    """(version, checksums) of the files on disk, or None while they are incomplete.
+
+    With a manifest the files have to match its checksums; a deploy that is
+    still copying simply does not match yet.
+    """
+    manifest = read_manifest(kind)
+    try:
+        checksums = artifact_checksums(kind)
+    except FileNotFoundError:
+        return None
+    if manifest is None:
+        return _combined_version(kind, checksums), checksums
+    if checksums != manifest["files"]:
+        return None
+    return manifest["version"], checksums
+
+
+# --- Validation ---
+def smoke_batch(backend, size=32, seed=0):
+    """Random but valid input rows for the backend's pipeline."""
+    rng = random.Random(seed)
+    if backend.kind == "onehot":
+        return pd.DataFrame([random_profile(rng) for _ in range(size)])
+    rows = []
+    for _ in range(size):
+        row = {}
+        for col in backend.model_features:
+            if col in backend.label_encoders:
+                row[col] = rng.choice(list(backend.label_encoders[col].classes_))
+            else:
+                row[col] = rng.uniform(*SIDEBAR_NUMERIC_LIMITS.get(col, (0, 5)))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def validate(backend, reference):
+    """Warm backend on a smoke batch and sanity-check it against the live reference.
+
+    Returns the smoke timings; raises ArtifactValidationError on a bad bundle.
+    """
+    if set(backend.classes_) != set(reference.classes_):
+        raise ArtifactValidationError(f"classes {list(backend.classes_)} differ from {list(reference.classes_)}")
+    batch = smoke_batch(backend)
+    timings = []
+    for _ in range(2):  # the first call warms caches and allocations
+        start = time.perf_counter()
+        proba = backend.predict_proba(batch)
+        timings.append(round((time.perf_counter() - start) * 1000, 2))
+    proba = np.asarray(proba, dtype=float)
+    if proba.shape != (len(batch), len(reference.classes_)):
+        raise ArtifactValidationError(f"predict_proba returned shape {proba.shape}")
+    if not np.isfinite(proba).all() or proba.min() < 0 or proba.max() > 1:
+        raise ArtifactValidationError("predict_proba returned values outside [0, 1]")
+    if not np.allclose(proba.sum(axis=1), 1.0, atol=1e-4):
+        raise ArtifactValidationError("predict_proba rows do not sum to 1")
+    return {"cold_ms": timings[0], "warm_ms": timings[1]}
+
+
+# --- Hot-swapping backend ---
+class HotReloadingBackend:
+    """A SklearnBackend that replaces itself when new artifacts are deployed.
+
+    Every request resolves the current backend once and uses it throughout,
+    so a swap never mixes two versions inside one request.
+    """
+
+    def __init__(self, backend, interval=5.0, probation_requests=50):
+        self.name = f"{backend.name}+hotreload"
+        self.kind = backend.kind
+        self.interval = interval
+        self.probation_requests = probation_requests
+        self.history = []
+        self._lock = threading.Lock()
+        self._current = backend
+        self._previous = self._previous_version = None
+        self._since_swap = 0
+        self._rejected = set()
+        loaded = current_version(self.kind)
+        self.version = loaded[0] if loaded else "unknown"
+        # Artifact checksums per loaded version, for caches tied to the live one
+        self._checksums = {self.version: loaded[1]} if loaded else {}
+        # File stats at the last poll and at the last checksum computation
+        self._signature = self._checked = _stat_signature(self.kind)
+        threading.Thread(target=self._watch, name="artifact-watcher", daemon=True).start()
+
+    # Same attributes the apps read from a backend, from whichever version is live
+    @property
+    def current(self):
+        return self._current
+
+    def checksums(self, version=None):
+        """{path: sha256} of version's artifacts (default: the live one), or None if unknown."""
+        return self._checksums.get(version or self.version)
+
+    @property
+    def classes_(self):
+        return self._current.classes_
+
+    @property
+    def model(self):
+        return self._current.model
+
+    @property
+    def preprocessor(self):
+        return self._current.preprocessor
+
+    @property
+    def label_encoders(self):
+        return self._current.label_encoders
+
+    @property
+    def model_features(self):
+        return self._current.model_features
+
+    def encode(self, df):
+        backend = self._current
+        return backend, backend.encode(df)
+
+    def predict_proba_encoded(self, encoded):
+        backend, X = encoded
+        return backend.predict_proba_encoded(X)
+
+    def predict_proba(self, df):
+        backend = self._current
+        try:
+            proba = backend.predict_proba(df)
+        except Exception as exc:
+            if not self._roll_back(backend, exc):
+                raise
+            return self._current.predict_proba(df)
+        self._since_swap += 1
+        return proba
+
+    def predict(self, df):
+        return self.classes_[np.argmax(self.predict_proba(df), axis=1)]
+
+    def _log(self, event, version, **detail):
+        entry = {"time": datetime.now().isoformat(timespec="seconds"), "event": event, "version": version, **detail}
+        self.history.append(entry)
+        del self.history[:-50]
+        print(f"Artifacts ({self.kind}): {event} {version} {detail or ''}", file=sys.stderr, flush=True)
+
+    def _roll_back(self, failed, exc):
+        """Return to the previous version if failed was swapped in only recently."""
+        with self._lock:
+            if failed is not self._current or self._previous is None or self._since_swap >= self.probation_requests:
+                return False
+            self._rejected.add(self.version)
+            self._log("rolled_back", self.version, error=repr(exc), to=self._previous_version)
+            self._current, self.version = self._previous, self._previous_version
+            self._previous = None
+            return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._poll()
+            except Exception as exc:  # keep watching; the live version is untouched
+                self._log("error", self.version, error=repr(exc))
+
+    def _poll(self):
+        signature = _stat_signature(self.kind)
+        manifest = read_manifest(self.kind)
+        if manifest is None:
+            # No manifest: take the files once they have not changed for one interval
+            settled = signature is not None and signature == self._signature
+            self._signature = signature
+            if not settled or signature == self._checked:
+                return
+        elif manifest["version"] == self.version or manifest["version"] in self._rejected:
+            return
+        loaded = current_version(self.kind)
+        if loaded is None:
+            return  # still being written
+        self._checked = signature
+        version, checksums = loaded
+        if version == self.version or version in self._rejected:
+            return
+        self._load(version, checksums)
+
+    def _load(self, version, checksums):
+        try:
+            candidate = SklearnBackend(self.kind)
+            if artifact_checksums(self.kind) != checksums:
+                return  # replaced again while loading; the next poll picks it up
+            smoke = validate(candidate, self._current)
+        except Exception as exc:
+            self._rejected.add(version)
+            self._log("rejected", version, error=repr(exc))
+            return
+        with self._lock:
+            self._checksums[version] = checksums
+            self._previous, self._previous_version = self._current, self.version
+            self._current, self.version = candidate, version
+            self._since_swap = 0
+        self._log("swapped", version, smoke=smoke)
+
+    def status(self):
+        return {"version": self.version, "requests_since_swap": self._since_swap,
+                "rejected": sorted(self._rejected), "history": self.history[-10:]}
+
+
+def maybe_hot_reloading(backend):
+    """backend wrapped in a HotReloadingBackend when HEARTGUARD_HOT_RELOAD_S > 0.
+
+    Only the sklearn backend reloads in place; the ONNX files and the
+    prediction pool's workers are replaced by restarting them.
+    """
+    interval = float(os.environ.get(HOT_RELOAD_ENV, "0"))
+    if interval <= 0 or not isinstance(backend, SklearnBackend):
+        return backend
+    return HotReloadingBackend(backend, interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish and check model artifact versions for hot reload")
+    parser.add_argument("command", choices=["publish", "check"])
+    parser.add_argument("--kind", choices=["onehot", "label"], default="onehot")
+    parser.add_argument("--version", help="Version name for publish (default: checksum prefix)")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        print(json.dumps(publish_manifest(args.kind, args.version), indent=2))
+        return
+
+    # check: load and smoke-test the files on disk as the watcher would
+    loaded = current_version(args.kind)
+    if loaded is None:
+        sys.exit("Artifacts do not match their manifest (still being written?)")
+    candidate = SklearnBackend(args.kind)
+    report = {"version": loaded[0], "files": loaded[1]}
+    try:
+        report["smoke"] = validate(candidate, candidate)
+    except ArtifactValidationError as exc:
+        report["error"] = str(exc)
+    print(json.dumps(report, indent=2))
+    if "error" in report:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
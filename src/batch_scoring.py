@@ -0,0 +1,144 @@
+import argparse
+import json
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import pipelines
+from inference_backends import SklearnBackend
+
+# Batch scoring that runs each distinct encoded profile through the forest
+# only once. Rows are grouped by the exact bytes of their encoded feature
+# vector within a chunk, and a bounded LRU cache carries results across
+# chunks, so repeats anywhere in the file are caught:
+#
+#   python batch_scoring.py survey.csv scored.csv --pipeline onehot
+#   python batch_scoring.py survey.csv scored.csv --round BMI=1 WeightInKilograms=0 HeightInMeters=2
+#   python batch_scoring.py survey.csv scored.csv --compact
+#
+# --round rounds raw numeric columns before encoding, which turns nearly
+# identical profiles into exact duplicates (and changes their scores
+# accordingly).
+
+
+class DedupScorer:
+    """predict_proba over encoded rows, evaluating each unique row once."""
+
+    def __init__(self, predict_proba, cache_size=200_000):
+        self.predict_proba = predict_proba
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.rows = self.unique_rows = self.cache_hits = self.model_rows = 0
+
+    @staticmethod
+    def _row_keys(X):
+        # Sparse chunks are densified only for hashing, in their own (float32) dtype
+        values = X.toarray() if sparse.issparse(X) else np.asarray(X)
+        if values.dtype.kind != "f":
+            values = values.astype(np.float64)
+        values = np.ascontiguousarray(values) + 0.0  # -0.0 -> 0.0
+        return values.view(np.dtype((np.void, values.dtype.itemsize * values.shape[1]))).ravel()
+
+    def score(self, X):
+        keys = self._row_keys(X)
+        unique_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        self.rows += len(keys)
+        self.unique_rows += len(unique_keys)
+
+        unique_proba = [None] * len(unique_keys)
+        missing = []
+        for i, key in enumerate(unique_keys):
+            key = key.tobytes()
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                self.cache.move_to_end(key)
+                unique_proba[i] = cached
+        self.cache_hits += len(unique_keys) - len(missing)
+
+        if missing:
+            rows = first_index[missing]
+            subset = X.iloc[rows] if isinstance(X, pd.DataFrame) else X[rows]
+            proba = self.predict_proba(subset)
+            self.model_rows += len(missing)
+            for i, p in zip(missing, proba):
+                unique_proba[i] = p
+                self.cache[unique_keys[i].tobytes()] = p
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return np.asarray(unique_proba)[inverse.ravel()]
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "unique_in_chunk_rows": self.unique_rows,
+            "cross_chunk_cache_hits": self.cache_hits,
+            "model_rows": self.model_rows,
+            "dedup_ratio": round(self.rows / self.model_rows, 2) if self.model_rows else None,
+        }
+
+
+def round_columns(df, decimals):
+    for col, places in decimals.items():
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce").round(places)
+    return df
+
+
+def score_csv(path, out_path, kind="onehot", chunksize=200_000, cache_size=200_000, decimals=None,
+              compact=False):
+    """Score every row of path into out_path; returns the DedupScorer with its stats."""
+    backend = SklearnBackend(kind, compact=compact)
+    scorer = DedupScorer(backend.predict_proba_encoded, cache_size)
+    positive = pipelines.positive_label(kind)
+    positive_idx = int(np.flatnonzero(backend.classes_ == positive)[0])
+
+    header = True
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if decimals:
+            chunk = round_columns(chunk, decimals)
+        proba = scorer.score(backend.encode(chunk))
+        chunk["risk_probability"] = proba[:, positive_idx]
+        chunk["prediction"] = backend.classes_[np.argmax(proba, axis=1)]
+        chunk.to_csv(out_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+    return scorer
+
+
+def _parse_rounding(items):
+    decimals = {}
+    for item in items:
+        col, _, places = item.partition("=")
+        decimals[col] = int(places)
+    return decimals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a survey CSV, evaluating each unique profile once")
+    parser.add_argument("path")
+    parser.add_argument("out_path")
+    parser.add_argument("--pipeline", choices=["onehot", "label"], default="onehot")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--cache-size", type=int, default=200_000,
+                        help="Unique profiles remembered across chunks")
+    parser.add_argument("--round", nargs="*", default=[], metavar="COLUMN=DECIMALS",
+                        help="Round raw numeric columns before encoding")
+    parser.add_argument("--compact", action="store_true",
+                        help="Encode chunks as float32 (CSR for the one-hot pipeline) instead of dense float64")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scorer = score_csv(args.path, args.out_path, args.pipeline, args.chunksize, args.cache_size,
+                       _parse_rounding(args.round), args.compact)
+    report = scorer.stats()
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+
+import pipelines
+from resource_usage import LIVE_RSS, timed
+
+# Compares the current dense float64 encodings with the compact ones
+# (float32 CSR for the one-hot pipeline, float32 frames for the label
+# pipeline) on the full dataset: matrix size, encoding time, forest
+# training time and peak memory, and prediction time and parity:
+#
+#   python compact_encoding.py --data heart_2022_no_nans.csv --pipeline onehot
+#   python compact_encoding.py --data heart_2022_no_nans.csv --pipeline onehot --out-dir artifacts/
+#
+# --out-dir saves the compact-trained forest with its sparse preprocessor as
+# model.pkl + preprocessor.pkl; App.py loads them unchanged.
+
+
+def matrix_mb(X):
+    if sparse.issparse(X):
+        nbytes = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    elif isinstance(X, pd.DataFrame):
+        nbytes = X.memory_usage(index=False).sum()
+    else:
+        nbytes = X.nbytes
+    return round(nbytes / 2 ** 20, 1)
+
+
+def encode(kind, compact, x_train, x_test, y_train):
+    """(preprocessor or None, X_train, X_test, y) for one pipeline/encoding."""
+    if kind == "onehot":
+        preprocessor = pipelines.build_preprocessor(x_train, compact=compact)
+        X_train = preprocessor.fit_transform(x_train)
+        X_test = preprocessor.transform(x_test)
+        if compact:
+            X_train = sparse.csr_matrix(X_train, dtype=np.float32)
+            X_test = sparse.csr_matrix(X_test, dtype=np.float32)
+        return preprocessor, X_train, X_test, y_train.to_numpy()
+
+    label_encoders, model_features = pipelines.load_label_encoding()
+    X_train = pipelines.encode_labels(x_train, label_encoders, model_features, compact)
+    X_test = pipelines.encode_labels(x_test, label_encoders, model_features, compact)
+    return None, X_train, X_test, pipelines.load_target_encoder().transform(y_train)
+
+
+def run(kind, compact, x_train, x_test, y_train, fit=True):
+    (preprocessor, X_train, X_test, y), encode_s, _ = timed(
+        lambda: encode(kind, compact, x_train, x_test, y_train))
+    report = {"encode_s": encode_s, "train_matrix_mb": matrix_mb(X_train)}
+    model = proba = None
+    if fit:
+        model, report["fit_s"], peak = timed(
+            lambda: RandomForestClassifier(**pipelines.RF_PARAMS, n_jobs=-1).fit(X_train, y))
+        if peak is not None:
+            report["fit_peak_rss_mb"] = peak
+        proba, report["predict_proba_s"], _ = timed(lambda: model.predict_proba(X_test))
+    return report, preprocessor, model, proba
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense float64 vs compact float32/CSR encodings")
+    parser.add_argument("--data", default="heart_2022_no_nans.csv")
+    parser.add_argument("--pipeline", choices=["onehot", "label"], default="onehot")
+    parser.add_argument("--no-fit", action="store_true", help="Only compare the encodings, skip the forests")
+    parser.add_argument("--out-dir", help="Save the compact-trained model and preprocessor here (onehot only)")
+    args = parser.parse_args()
+
+    features = pipelines.APP_FEATURES
+    if args.pipeline == "label":
+        features = pipelines.load_label_encoding()[1]
+    df = pd.read_csv(args.data)
+    x_train, x_test, y_train, _ = pipelines.training_split(df, features=features, sample_size=None)
+    del df
+
+    fit = not args.no_fit
+    if fit and not LIVE_RSS:
+        print("psutil is not installed: fit_peak_rss_mb is left out of the report", file=sys.stderr)
+    dense, _, _, dense_proba = run(args.pipeline, False, x_train, x_test, y_train, fit)
+    compact, preprocessor, model, compact_proba = run(args.pipeline, True, x_train, x_test, y_train, fit)
+    report = {"pipeline": args.pipeline, "train_rows": int(len(x_train)), "dense_float64": dense,
+              "compact": compact}
+    if fit:
+        diff = np.abs(dense_proba - compact_proba).max(axis=1)
+        report["parity"] = {"max_abs_proba_diff": round(float(diff.max()), 6),
+                            "label_agreement": round(float(np.mean(
+                                dense_proba.argmax(axis=1) == compact_proba.argmax(axis=1))), 6)}
+
+    if args.out_dir and fit and args.pipeline == "onehot":
+        os.makedirs(args.out_dir, exist_ok=True)
+        joblib.dump(model, os.path.join(args.out_dir, pipelines.MODEL_PATH))
+        joblib.dump(preprocessor, os.path.join(args.out_dir, pipelines.PREPROCESSOR_PATH))
+        report["saved_to"] = args.out_dir
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+import pipelines
+from form_options import GENERAL_HEALTH_OPTIONS, WEIGHT_LIMITS, random_profile
+
+# Counterfactual search: the cheapest combination of actionable changes
+# (weight and with it BMI, smoking, sleep, physical health days, general
+# health) that brings a profile's predicted risk under the App.py risk
+# thresholds. Candidates are scored by the deployed model, a whole beam level
+# per predict_proba call, and the search stops at the time budget with the
+# best changes found so far:
+#
+#   python counterfactual.py --queries 100 --budget-ms 500
+#   python counterfactual.py --profile profile.json
+#
+# Costs are rough effort units (losing 5 kg = 1, quitting smoking = 3, ...)
+# used to rank changes, not clinical advice.
+
+# Risk thresholds of the App.py result boxes (high > 70%, moderate > 30%)
+THRESHOLDS = (0.7, 0.3)
+
+WEIGHT_STEP_KG = 2.5
+MAX_WEIGHT_LOSS = 0.2       # fraction of current weight
+HEALTHY_BMI = 18.5          # never suggest losing weight below this
+HEALTHY_SLEEP = (7, 9)
+
+COST_PER_KG = 0.2
+COST_QUIT_SMOKING = 3.0
+COST_PER_SLEEP_HOUR = 0.5
+COST_PER_HEALTH_DAY = 0.1
+COST_PER_HEALTH_LEVEL = 1.5
+
+
+# --- Candidate changes ---
+def weight_options(profile):
+    weight, height = profile["WeightInKilograms"], profile["HeightInMeters"]
+    floor = max(weight * (1 - MAX_WEIGHT_LOSS), HEALTHY_BMI * height ** 2, WEIGHT_LIMITS[0])
+    options = []
+    for loss in np.arange(WEIGHT_STEP_KG, weight - floor + 1e-9, WEIGHT_STEP_KG):
+        new_weight = round(weight - loss, 1)
+        options.append(({"WeightInKilograms": new_weight, "BMI": round(new_weight / height ** 2, 2)},
+                        COST_PER_KG * loss))
+    return options
+
+
+def smoker_options(profile):
+    if profile["SmokerStatus"] == "Current smoker":
+        return [({"SmokerStatus": "Former smoker"}, COST_QUIT_SMOKING)]
+    return []
+
+
+def sleep_options(profile):
+    hours = profile["SleepHours"]
+    low, high = HEALTHY_SLEEP
+    if hours < low:
+        targets = range(int(hours) + 1, high + 1)
+    elif hours > high:
+        targets = range(low, int(np.ceil(hours)))
+    else:
+        targets = []
+    return [({"SleepHours": target}, COST_PER_SLEEP_HOUR * abs(target - hours))
+            for target in targets if target != hours]
+
+
+def physical_days_options(profile):
+    days = int(profile["PhysicalHealthDays"])
+    targets = sorted({0, days // 4, days // 2, (3 * days) // 4} - {days})
+    return [({"PhysicalHealthDays": target}, COST_PER_HEALTH_DAY * (days - target)) for target in targets]
+
+
+def general_health_options(profile):
+    level = GENERAL_HEALTH_OPTIONS.index(profile["GeneralHealth"])
+    return [({"GeneralHealth": option}, COST_PER_HEALTH_LEVEL * (i - level))
+            for i, option in enumerate(GENERAL_HEALTH_OPTIONS) if i > level]
+
+
+# One entry per actionable input; a counterfactual changes each at most once
+ACTIONS = {
+    "WeightInKilograms": weight_options,
+    "SmokerStatus": smoker_options,
+    "SleepHours": sleep_options,
+    "PhysicalHealthDays": physical_days_options,
+    "GeneralHealth": general_health_options,
+}
+
+
+def describe_change(action, profile, changes):
+    if action == "WeightInKilograms":
+        return (f"Lose {profile['WeightInKilograms'] - changes['WeightInKilograms']:g} kg "
+                f"(BMI {profile['BMI']} → {changes['BMI']})")
+    if action == "SmokerStatus":
+        return "Quit smoking"
+    if action == "SleepHours":
+        return f"Sleep {changes['SleepHours']:g} hours a night instead of {profile['SleepHours']:g}"
+    if action == "PhysicalHealthDays":
+        return (f"Bring days with physical health issues down from {profile['PhysicalHealthDays']} "
+                f"to {changes['PhysicalHealthDays']}")
+    return f"Improve general health from {profile['GeneralHealth']} to {changes['GeneralHealth']}"
+
+
+# --- Search ---
+def search(backend, profile, thresholds=THRESHOLDS, beam_width=32, n_solutions=3, budget_ms=500,
+           cost_weight=0.02):
+    """Cheapest sets of changes that bring profile under each threshold.
+
+    Beam search over ACTIONS: every level extends each beam state by one more
+    action, scores all extensions in a single predict_proba call, and keeps
+    the beam_width states with the lowest probability + cost_weight * cost.
+    States that already cost at least as much as the n_solutions-th solution
+    for the strictest threshold are pruned, since nothing built from them
+    can be cheaper. Returns a dict with the current probability, the
+    solutions per threshold (sorted by cost) and whether the search finished
+    within budget_ms.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    positive_idx = int(np.flatnonzero(backend.classes_ == pipelines.positive_label(backend.kind))[0])
+    options = {action: make_options(profile) for action, make_options in ACTIONS.items()}
+    strictest = min(thresholds)
+    solutions = {threshold: [] for threshold in thresholds}
+
+    def bound():
+        found = solutions[strictest]
+        return found[n_solutions - 1]["cost"] if len(found) >= n_solutions else np.inf
+
+    base_probability = float(backend.predict_proba(pd.DataFrame([profile]))[0, positive_idx])
+    if base_probability < strictest:
+        return {"probability": base_probability, "solutions": solutions, "complete": True}
+    # A state is (actions taken, merged column changes, cost)
+    beam = [((), {}, 0.0)]
+    seen = set()
+    complete = True
+    while beam:
+        if time.perf_counter() > deadline:
+            complete = False
+            break
+        candidates = []
+        for taken, changes, cost in beam:
+            for action, action_options in options.items():
+                if action in taken:
+                    continue
+                for option, option_cost in action_options:
+                    new_cost = cost + option_cost
+                    if new_cost >= bound():
+                        continue
+                    new_changes = {**changes, **option}
+                    key = frozenset((col, value) for col, value in new_changes.items())
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    candidates.append((tuple(sorted(taken + (action,))), new_changes, new_cost))
+        if not candidates:
+            break
+
+        frame = pd.DataFrame([{**profile, **changes} for _, changes, _ in candidates])
+        probabilities = backend.predict_proba(frame)[:, positive_idx]
+
+        survivors = []
+        for (taken, changes, cost), probability in zip(candidates, probabilities):
+            reached = [t for t in thresholds if probability < t <= base_probability]
+            for threshold in reached:
+                solutions[threshold].append({"actions": taken, "changes": changes, "cost": round(cost, 3),
+                                             "probability": float(probability)})
+            # Anything built on top of a state that reaches every threshold costs more
+            if len(reached) < sum(t <= base_probability for t in thresholds):
+                survivors.append((probability + cost_weight * cost, taken, changes, cost))
+        for threshold in thresholds:
+            solutions[threshold] = sorted(solutions[threshold], key=lambda s: s["cost"])[:n_solutions]
+
+        survivors = [s for s in survivors if s[3] < bound()]
+        survivors.sort(key=lambda s: s[0])
+        beam = [(taken, changes, cost) for _, taken, changes, cost in survivors[:beam_width]]
+
+    for found in solutions.values():
+        for solution in found:
+            solution["descriptions"] = [describe_change(action, profile, solution["changes"])
+                                        for action in solution["actions"]]
+    return {"probability": base_probability, "solutions": solutions, "complete": complete}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cheapest actionable changes that lower the predicted risk")
+    parser.add_argument("--backend", help="Inference backend (default: HEARTGUARD_BACKEND)")
+    parser.add_argument("--profile", help="JSON file with one App.py input_dict; default: random profiles")
+    parser.add_argument("--queries", type=int, default=50, help="Random profiles to search when --profile is not given")
+    parser.add_argument("--budget-ms", type=float, default=500)
+    parser.add_argument("--beam-width", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from inference_backends import get_backend
+
+    backend = get_backend("onehot", args.backend)
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+        result = search(backend, profile, beam_width=args.beam_width, budget_ms=args.budget_ms)
+        print(json.dumps(result, indent=2))
+        return
+
+    rng = random.Random(args.seed)
+    timings, complete = [], 0
+    found = {threshold: 0 for threshold in THRESHOLDS}
+    at_risk = {threshold: 0 for threshold in THRESHOLDS}
+    for _ in range(args.queries):
+        profile = random_profile(rng)
+        start = time.perf_counter()
+        result = search(backend, profile, beam_width=args.beam_width, budget_ms=args.budget_ms)
+        timings.append((time.perf_counter() - start) * 1000)
+        complete += result["complete"]
+        for threshold in THRESHOLDS:
+            if result["probability"] >= threshold:
+                at_risk[threshold] += 1
+                found[threshold] += bool(result["solutions"][threshold])
+    print(json.dumps({
+        "queries": args.queries,
+        "budget_ms": args.budget_ms,
+        "completed_within_budget": complete,
+        **{f"p{q}_ms": round(float(np.percentile(timings, q)), 2) for q in (50, 95, 99)},
+        "found_below_threshold": {str(t): f"{found[t]}/{at_risk[t]}" for t in THRESHOLDS},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
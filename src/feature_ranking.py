@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+import pipelines
+
+# Ranks the survey columns by how much they tell about HadHeartAttack, in
+# place of Machine.ipynb's full-data importance forest. The ranking is cached
+# next to the data and reused until the CSV changes:
+#
+#   python feature_ranking.py --data heart_2022_no_nans.csv --method mi
+#   python feature_ranking.py --data heart_2022_no_nans.csv --method permutation --top-k 15
+#
+# Training code picks the features up with top_features(load_or_rank(...), k).
+
+CACHE_PATH = "feature_ranking.json"
+# Machine.ipynb added Sex to the selected columns by hand
+ALWAYS_INCLUDE = ("Sex",)
+
+
+def _discretize(df, n_bins):
+    """Integer codes per column: categories as-is, numbers as quantile histogram bins."""
+    codes = {}
+    for col in df.columns:
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            # object, pandas' str dtype and categoricals alike
+            codes[col] = pd.factorize(values)[0]
+        else:
+            numeric = values.to_numpy(dtype=float)
+            edges = np.unique(np.nanquantile(numeric, np.linspace(0, 1, n_bins + 1)[1:-1]))
+            codes[col] = np.searchsorted(edges, numeric, side="right")
+            codes[col][np.isnan(numeric)] = len(edges) + 1
+    return codes
+
+
+def mutual_information(codes, y):
+    """MI (nats) between integer-coded x and y from their contingency table.
+
+    Includes the Miller-Madow correction so many-valued columns such as State
+    aren't favoured just for having more cells.
+    """
+    codes = codes - codes.min()
+    n_x, n_y = codes.max() + 1, y.max() + 1
+    joint = np.bincount(codes * n_y + y, minlength=n_x * n_y).reshape(n_x, n_y).astype(float)
+    joint /= joint.sum()
+    px = joint.sum(axis=1, keepdims=True)
+    py = joint.sum(axis=0, keepdims=True)
+    nonzero = joint > 0
+    mi = float(np.sum(joint[nonzero] * np.log(joint[nonzero] / (px @ py)[nonzero])))
+    occupied_x, occupied_y = int((px > 0).sum()), int((py > 0).sum())
+    return mi - (occupied_x - 1) * (occupied_y - 1) / (2 * len(codes))
+
+
+def rank_mutual_information(X, y, n_bins=32):
+    y_codes = pd.factorize(y, sort=True)[0]
+    codes = _discretize(X, n_bins)
+    return {col: mutual_information(codes[col], y_codes) for col in X.columns}
+
+
+def rank_permutation(X, y, n_estimators=50, max_depth=12, min_repeats=3, max_repeats=20,
+                     tol=0.001, random_state=42):
+    """Drop in held-out ROC AUC when each column is shuffled.
+
+    A feature stops being reshuffled once the standard error of its mean drop
+    falls below tol, so clearly useless or clearly important columns cost only
+    min_repeats passes.
+    """
+    rng = np.random.default_rng(random_state)
+    X_codes = pd.DataFrame(_discretize(X, n_bins=256), index=X.index)
+    y_codes = pd.factorize(y, sort=True)[0]
+    x_fit, x_val, y_fit, y_val = train_test_split(X_codes, y_codes, test_size=0.3, stratify=y_codes,
+                                                  random_state=random_state)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, n_jobs=-1,
+                                   random_state=random_state).fit(x_fit, y_fit)
+    x_val = x_val.to_numpy()
+    baseline = roc_auc_score(y_val, model.predict_proba(x_val)[:, 1])
+
+    scores = {}
+    for j, col in enumerate(X.columns):
+        drops = []
+        shuffled = x_val.copy()
+        while len(drops) < max_repeats:
+            shuffled[:, j] = rng.permutation(x_val[:, j])
+            drops.append(baseline - roc_auc_score(y_val, model.predict_proba(shuffled)[:, 1]))
+            if len(drops) >= min_repeats and np.std(drops, ddof=1) / np.sqrt(len(drops)) < tol:
+                break
+        scores[col] = float(np.mean(drops))
+    return scores
+
+
+METHODS = {
+    "mi": rank_mutual_information,
+    "permutation": rank_permutation,
+}
+
+
+def stratified_subsample(df, n_rows, random_state=42):
+    if n_rows is None or n_rows >= len(df):
+        return df
+    subsample, _ = train_test_split(df, train_size=n_rows, stratify=df[pipelines.TARGET],
+                                    random_state=random_state)
+    return subsample
+
+
+def rank_features(df, method="mi", n_rows=50_000, random_state=42):
+    """[(feature, score), ...] sorted from most to least informative."""
+    df = stratified_subsample(df, n_rows, random_state)
+    X = df.drop(pipelines.TARGET, axis=1)
+    scores = METHODS[method](X, df[pipelines.TARGET])
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"data": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_or_rank(data_path, method="mi", n_rows=50_000, cache_path=CACHE_PATH, random_state=42):
+    """Cached ranking for data_path; recomputed when the file or settings change."""
+    key = dict(_fingerprint(data_path), method=method, n_rows=n_rows, random_state=random_state)
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return [tuple(item) for item in cached["ranking"]]
+
+    ranking = rank_features(pd.read_csv(data_path), method, n_rows, random_state)
+    with open(cache_path, "w") as f:
+        json.dump({"key": key, "ranking": ranking}, f, indent=2)
+    return ranking
+
+
+def top_features(ranking, k, always_include=ALWAYS_INCLUDE):
+    """The k best-ranked feature names, plus any always_include columns."""
+    features = [feature for feature, _ in ranking[:k]]
+    return features + [col for col in always_include if col not in features]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank survey columns for the heart attack model")
+    parser.add_argument("--data", default="heart_2022_no_nans.csv")
+    parser.add_argument("--method", choices=sorted(METHODS), default="mi")
+    parser.add_argument("--rows", type=int, default=50_000, help="Stratified subsample size")
+    parser.add_argument("--top-k", type=int, default=25)
+    parser.add_argument("--cache", default=CACHE_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ranking = load_or_rank(args.data, args.method, args.rows, args.cache)
+    seconds = time.perf_counter() - start
+
+    print(f"Top {args.top_k} features ({args.method}, {seconds:.2f}s):")
+    for feature, score in ranking[:args.top_k]:
+        print(f"  {feature:<28} {score:.5f}")
+    print("Selected:", top_features(ranking, args.top_k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import random
+
+# Option lists and numeric limits of the App.py assessment form. App.py builds
+# its widgets from these; tools that need realistic form inputs reuse them.
+
+SEX_OPTIONS = ["Male", "Female", "Other"]
+AGE_CATEGORY_OPTIONS = [
+    "18-24", "25-29", "30-34", "35-39", "40-44", "45-49",
+    "50-54", "55-59", "60-64", "65-69", "70-74", "75-79", "80+"
+]
+STATES_BY_REGION = {
+    "Northeast": ["Connecticut", "Maine", "Massachusetts", "New Hampshire",
+                  "Rhode Island", "Vermont", "New Jersey", "New York", "Pennsylvania"],
+    "Midwest": ["Illinois", "Indiana", "Michigan", "Ohio", "Wisconsin",
+               "Iowa", "Kansas", "Minnesota", "Missouri", "Nebraska",
+               "North Dakota", "South Dakota"],
+    "South": ["Delaware", "Florida", "Georgia", "Maryland", "North Carolina",
+             "South Carolina", "Virginia", "West Virginia", "Alabama",
+             "Kentucky", "Mississippi", "Tennessee", "Arkansas",
+             "Louisiana", "Oklahoma", "Texas"],
+    "West": ["Arizona", "Colorado", "Idaho", "Montana", "Nevada",
+            "New Mexico", "Utah", "Wyoming", "Alaska", "California",
+            "Hawaii", "Oregon", "Washington"]
+}
+GENERAL_HEALTH_OPTIONS = ["Poor", "Fair", "Good", "Very good", "Excellent"]
+YES_NO_OPTIONS = ["Yes", "No"]
+SMOKER_OPTIONS = ["Never smoked", "Former smoker", "Current smoker"]
+REMOVED_TEETH_OPTIONS = ["None", "1 to 5", "6 or more but not all", "All"]
+
+# (min, max) of the numeric widgets
+WEIGHT_LIMITS = (30.0, 200.0)
+HEIGHT_LIMITS = (1.0, 2.5)
+SLEEP_HOURS_LIMITS = (0, 24)
+HEALTH_DAYS_LIMITS = (0, 30)
+
+# Choices per App.py input column
+CATEGORICAL_OPTIONS = {
+    "Sex": SEX_OPTIONS,
+    "AgeCategory": AGE_CATEGORY_OPTIONS,
+    "State": [state for states in STATES_BY_REGION.values() for state in states],
+    "GeneralHealth": GENERAL_HEALTH_OPTIONS,
+    "HadStroke": YES_NO_OPTIONS,
+    "HadAngina": YES_NO_OPTIONS,
+    "SmokerStatus": SMOKER_OPTIONS,
+    "RemovedTeeth": REMOVED_TEETH_OPTIONS,
+    "TetanusLast10Tdap": YES_NO_OPTIONS,
+}
+NUMERIC_LIMITS = {
+    "WeightInKilograms": WEIGHT_LIMITS,
+    "HeightInMeters": HEIGHT_LIMITS,
+    # BMI is derived from weight and height, so it spans what those limits allow
+    "BMI": (round(WEIGHT_LIMITS[0] / HEIGHT_LIMITS[1] ** 2, 2), round(WEIGHT_LIMITS[1] / HEIGHT_LIMITS[0] ** 2, 2)),
+    "SleepHours": SLEEP_HOURS_LIMITS,
+    "PhysicalHealthDays": HEALTH_DAYS_LIMITS,
+    "MentalHealthDays": HEALTH_DAYS_LIMITS,
+}
+
+# (min, max) of the app.py sidebar's numeric widgets
+SIDEBAR_NUMERIC_LIMITS = {
+    "PhysicalHealthDays": HEALTH_DAYS_LIMITS,
+    "MentalHealthDays": HEALTH_DAYS_LIMITS,
+    "SleepHours": (0.0, 24.0),
+    "HeightInMeters": (1.0, 2.5),
+    "WeightInKilograms": (30.0, 250.0),
+    "BMI": (10.0, 60.0),
+}
+
+
+def _clip(value, low, high):
+    return min(max(value, low), high)
+
+
+def random_profile(rng=random):
+    """One input_dict as App.py would build it from a random form submission."""
+    # Draw height and BMI around adult survey averages rather than uniformly
+    # over the widget range, which would mostly produce impossible bodies
+    height = round(_clip(rng.gauss(1.70, 0.10), *HEIGHT_LIMITS), 2)                  # step=0.01
+    weight = round(_clip(rng.gauss(28.5, 6.5) * height ** 2, *WEIGHT_LIMITS) * 2) / 2  # step=0.5
+    profile = {col: rng.choice(options) for col, options in CATEGORICAL_OPTIONS.items()}
+    profile.update({
+        "BMI": round(weight / (height ** 2), 2),
+        "WeightInKilograms": weight,
+        "HeightInMeters": height,
+        "SleepHours": rng.randint(*SLEEP_HOURS_LIMITS),
+        "PhysicalHealthDays": rng.randint(*HEALTH_DAYS_LIMITS),
+        "MentalHealthDays": rng.randint(*HEALTH_DAYS_LIMITS),
+    })
+    return profile
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import (average_precision_score, balanced_accuracy_score, brier_score_loss,
+                             f1_score, precision_score, recall_score, roc_auc_score)
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+import pipelines
+from resource_usage import LIVE_RSS, timed
+
+# Trains on every row of the survey with histogram-binned gradient boosting,
+# weighting the classes instead of downsampling "No" to ~13k rows. The
+# categorical columns are ordinal-encoded and split on natively, and the
+# result is saved as model.pkl + preprocessor.pkl, which App.py loads as-is:
+#
+#   python hist_gb_training.py --data heart_2022_no_nans.csv --out-dir artifacts/
+#
+# Unless --no-compare is given, the downsampled forest from Machine.ipynb is
+# retrained on the same training split and both are scored on one held-out
+# validation set with the natural class balance.
+
+
+def build_preprocessor(X):
+    """preprocessor.pkl layout with ordinal codes instead of one-hot columns.
+
+    Numeric columns come first, so the categorical ones are the last
+    len(categorical_cols) outputs.
+    """
+    categorical_cols = X.select_dtypes(exclude='number').columns.tolist()
+    numerical_cols = X.select_dtypes(include='number').columns.tolist()
+    preprocessor = ColumnTransformer([
+        ('numerical_pipe', 'passthrough', numerical_cols),
+        ('categorical_pipe', Pipeline([
+            # Unseen categories become NaN, which the trees send down the missing-value branch
+            ('encoder', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=np.nan))
+        ]), categorical_cols)
+    ])
+    categorical_mask = np.array([False] * len(numerical_cols) + [True] * len(categorical_cols))
+    return preprocessor, categorical_mask
+
+
+def build_model(categorical_mask, max_iter=500, learning_rate=0.1, random_state=42):
+    return HistGradientBoostingClassifier(
+        categorical_features=categorical_mask,
+        class_weight='balanced',
+        max_iter=max_iter,
+        learning_rate=learning_rate,
+        early_stopping=True,
+        validation_fraction=0.1,
+        random_state=random_state
+    )
+
+
+def validation_metrics(y_true, proba, threshold=0.5):
+    y_true = (np.asarray(y_true) == "Yes").astype(int)
+    y_pred = (proba >= threshold).astype(int)
+    return {
+        "roc_auc": round(float(roc_auc_score(y_true, proba)), 4),
+        "average_precision": round(float(average_precision_score(y_true, proba)), 4),
+        "balanced_accuracy": round(float(balanced_accuracy_score(y_true, y_pred)), 4),
+        "precision_yes": round(float(precision_score(y_true, y_pred, zero_division=0)), 4),
+        "recall_yes": round(float(recall_score(y_true, y_pred)), 4),
+        "f1_yes": round(float(f1_score(y_true, y_pred)), 4),
+        "brier": round(float(brier_score_loss(y_true, proba)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-dataset histogram gradient boosting for App.py")
+    parser.add_argument("--data", default="heart_2022_no_nans.csv")
+    parser.add_argument("--max-iter", type=int, default=500)
+    parser.add_argument("--learning-rate", type=float, default=0.1)
+    parser.add_argument("--no-compare", action="store_true", help="Skip the downsampled forest baseline")
+    parser.add_argument("--out-dir", help="Save model.pkl and preprocessor.pkl here")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data, usecols=pipelines.APP_FEATURES + [pipelines.TARGET])
+    train_df, val_df = train_test_split(df, test_size=0.2, stratify=df[pipelines.TARGET], random_state=42)
+    x_val, y_val = val_df.drop(pipelines.TARGET, axis=1), val_df[pipelines.TARGET]
+    report = {"train_rows": int(len(train_df)), "validation_rows": int(len(val_df))}
+
+    x_train, y_train = train_df.drop(pipelines.TARGET, axis=1), train_df[pipelines.TARGET]
+    preprocessor, categorical_mask = build_preprocessor(x_train)
+    model = build_model(categorical_mask, args.max_iter, args.learning_rate)
+
+    def fit_hgb():
+        return model.fit(preprocessor.fit_transform(x_train), y_train)
+
+    if not LIVE_RSS:
+        print("psutil is not installed: peak_rss_mb is left out of the report", file=sys.stderr)
+
+    _, seconds, peak = timed(fit_hgb)
+    proba = pipelines.positive_proba(model, preprocessor.transform(x_val), "Yes")
+    report["hist_gb"] = {"train_s": seconds, "iterations": int(model.n_iter_), **validation_metrics(y_val, proba)}
+    if peak is not None:
+        report["hist_gb"]["peak_rss_mb"] = peak
+
+    if not args.no_compare:
+        balanced = pipelines.balanced_sample(train_df, pipelines.ONEHOT_SAMPLE_SIZE)
+        x_bal, y_bal = balanced.drop(pipelines.TARGET, axis=1), balanced[pipelines.TARGET]
+        rf_preprocessor = pipelines.build_preprocessor(x_bal)
+        forest = RandomForestClassifier(**pipelines.RF_PARAMS)
+
+        def fit_forest():
+            return forest.fit(rf_preprocessor.fit_transform(x_bal), y_bal)
+
+        _, seconds, peak = timed(fit_forest)
+        proba = pipelines.positive_proba(forest, rf_preprocessor.transform(x_val), "Yes")
+        report["downsampled_forest"] = {"train_rows": int(len(balanced)), "train_s": seconds,
+                                        **validation_metrics(y_val, proba)}
+        if peak is not None:
+            report["downsampled_forest"]["peak_rss_mb"] = peak
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        joblib.dump(model, os.path.join(args.out_dir, pipelines.MODEL_PATH))
+        joblib.dump(preprocessor, os.path.join(args.out_dir, pipelines.PREPROCESSOR_PATH))
+        report["saved_to"] = args.out_dir
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
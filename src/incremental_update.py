@@ -0,0 +1,129 @@
+import argparse
+import copy
+import json
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+import pipelines
+
+# Grow a deployed forest with extra trees fit on a new survey wave instead of
+# rerunning the training notebooks.
+#
+#   python incremental_update.py --pipeline onehot --new-data wave_2023.csv --n-trees 50
+#   python incremental_update.py --pipeline label --new-data wave_2023.csv --n-trees 50 \
+#       --retire-oldest --reference heart_2022_no_nans.csv
+
+
+def append_trees(model, X_new, y_new, n_new_trees, retire_oldest=False):
+    """Copy of model with n_new_trees extra trees fit on (X_new, y_new).
+
+    With retire_oldest the same number of the oldest trees is dropped, so the
+    forest keeps its size.
+    """
+    missing = set(model.classes_) - set(np.unique(y_new))
+    if missing:
+        raise ValueError(f"New batch has no rows for class(es) {sorted(missing)}; "
+                         "warm-started trees need every class the forest was trained on")
+
+    updated = copy.deepcopy(model)
+    n_before = len(updated.estimators_)
+    updated.set_params(warm_start=True, n_estimators=n_before + n_new_trees)
+    updated.fit(X_new, y_new)
+    updated.set_params(warm_start=False)
+
+    if retire_oldest:
+        updated.estimators_ = updated.estimators_[n_new_trees:]
+        updated.set_params(n_estimators=len(updated.estimators_))
+    return updated
+
+
+def drift_report(updated, retrained, X_val, y_val, positive):
+    """How far the incrementally updated forest is from a full retrain."""
+    p_updated = pipelines.positive_proba(updated, X_val, positive)
+    p_retrained = pipelines.positive_proba(retrained, X_val, positive)
+    y_true = (np.asarray(y_val) == positive).astype(int)
+    diff = np.abs(p_updated - p_retrained)
+    return {
+        "validation_rows": int(len(y_true)),
+        "mean_abs_proba_diff": float(diff.mean()),
+        "p95_abs_proba_diff": float(np.percentile(diff, 95)),
+        "max_abs_proba_diff": float(diff.max()),
+        "label_agreement": float(np.mean((p_updated >= 0.5) == (p_retrained >= 0.5))),
+        "updated_accuracy": float(accuracy_score(y_true, p_updated >= 0.5)),
+        "retrained_accuracy": float(accuracy_score(y_true, p_retrained >= 0.5)),
+        "updated_roc_auc": float(roc_auc_score(y_true, p_updated)),
+        "retrained_roc_auc": float(roc_auc_score(y_true, p_retrained)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally update a deployed heart attack forest")
+    parser.add_argument("--pipeline", choices=["onehot", "label"], default="onehot",
+                        help="onehot: model.pkl + preprocessor.pkl (App.py); label: best_heart_model.pkl (app.py)")
+    parser.add_argument("--new-data", required=True, help="CSV with the new labeled survey rows")
+    parser.add_argument("--n-trees", type=int, default=50, help="Number of trees to add")
+    parser.add_argument("--retire-oldest", action="store_true", help="Drop as many old trees as were added")
+    parser.add_argument("--reference", help="Original dataset CSV; enables the drift check against a full retrain")
+    parser.add_argument("--validation-size", type=float, default=0.2,
+                        help="Share of the new batch held out for the drift check")
+    parser.add_argument("--out", help="Where to write the updated model (default: <model>_updated.pkl)")
+    parser.add_argument("--random-state", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.pipeline == "onehot":
+        bundle = pipelines.load_onehot_bundle()
+        model_path, sample_size = pipelines.MODEL_PATH, pipelines.ONEHOT_SAMPLE_SIZE
+    else:
+        bundle = pipelines.load_label_bundle()
+        model_path, sample_size = pipelines.LABEL_MODEL_PATH, pipelines.LABEL_SAMPLE_SIZE
+    model = bundle[0]
+    target_encoder = pipelines.load_target_encoder() if args.pipeline == "label" else None
+    positive = pipelines.positive_label(args.pipeline)
+
+    new_df = pd.read_csv(args.new_data)
+    if args.reference:
+        new_train, new_val = train_test_split(new_df, test_size=args.validation_size,
+                                              stratify=new_df[pipelines.TARGET],
+                                              random_state=args.random_state)
+    else:
+        new_train, new_val = new_df, None
+
+    X_new, y_new = pipelines.encode_batch(new_train, args.pipeline, bundle, target_encoder)
+    start = time.perf_counter()
+    updated = append_trees(model, X_new, y_new, args.n_trees, retire_oldest=args.retire_oldest)
+    update_seconds = time.perf_counter() - start
+
+    report = {
+        "pipeline": args.pipeline,
+        "new_rows": int(len(new_train)),
+        "trees_before": len(model.estimators_),
+        "trees_after": len(updated.estimators_),
+        "update_seconds": round(update_seconds, 3),
+    }
+
+    if args.reference:
+        reference = pipelines.balanced_sample(pd.read_csv(args.reference), sample_size,
+                                              random_state=args.random_state)
+        full_df = pd.concat([reference, new_train], ignore_index=True)
+        X_full, y_full = pipelines.encode_batch(full_df, args.pipeline, bundle, target_encoder)
+        start = time.perf_counter()
+        retrained = clone(model).fit(X_full, y_full)
+        report["retrain_seconds"] = round(time.perf_counter() - start, 3)
+
+        X_val, y_val = pipelines.encode_batch(new_val, args.pipeline, bundle, target_encoder)
+        report["drift"] = drift_report(updated, retrained, X_val, y_val, positive)
+
+    out_path = args.out or model_path.replace(".pkl", "_updated.pkl")
+    joblib.dump(updated, out_path)
+    report["saved_to"] = out_path
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
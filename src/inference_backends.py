@@ -0,0 +1,201 @@
+import json
+import os
+import socket
+import struct
+
+import numpy as np
+
+import pipelines
+
+# Prediction backends shared by App.py (kind="onehot") and app.py (kind="label").
+# Pick one with HEARTGUARD_BACKEND=sklearn|onnx|pool; sklearn is the default.
+BACKEND_ENV = "HEARTGUARD_BACKEND"
+ONNX_THREADS_ENV = "HEARTGUARD_ONNX_THREADS"
+
+ONNX_MODEL_PATH = "model.onnx"
+LABEL_ONNX_MODEL_PATH = "best_heart_model.onnx"
+
+# Unix socket of the prediction_pool.py server used by the "pool" backend
+POOL_SOCKET_ENV = "HEARTGUARD_POOL_SOCKET"
+DEFAULT_POOL_SOCKET = "/tmp/heartguard.sock"
+
+
+class SklearnBackend:
+    """The pickled sklearn artifacts, as the apps have always used them."""
+
+    name = "sklearn"
+
+    def __init__(self, kind="onehot", compact=False):
+        self.kind = kind
+        self.compact = compact
+        self.label_encoders = self.model_features = self.preprocessor = None
+        if kind == "onehot":
+            self.model, self.preprocessor = pipelines.load_onehot_bundle()
+            if compact:
+                self.preprocessor = pipelines.compact_preprocessor(self.preprocessor)
+            self.bundle = (self.model, self.preprocessor)
+        else:
+            self.bundle = pipelines.load_label_bundle()
+            self.model, self.label_encoders, self.model_features = self.bundle
+        self.classes_ = self.model.classes_
+
+    def encode(self, df):
+        X, _ = pipelines.encode_batch(df, self.kind, self.bundle, compact=self.compact)
+        return X
+
+    def predict_proba_encoded(self, X):
+        return self.model.predict_proba(X)
+
+    def predict_proba(self, df):
+        return self.predict_proba_encoded(self.encode(df))
+
+    def predict(self, df):
+        return self.classes_[np.argmax(self.predict_proba(df), axis=1)]
+
+
+class OnnxBackend:
+    """ONNX Runtime inference on the files written by onnx_export.py."""
+
+    name = "onnx"
+
+    def __init__(self, kind="onehot", path=None, threads=None):
+        import onnxruntime as ort
+
+        self.kind = kind
+        self.label_encoders = self.model_features = None
+        # No sklearn model to inspect (e.g. for feature importances) on this backend
+        self.model = self.preprocessor = None
+        if path is None:
+            path = ONNX_MODEL_PATH if kind == "onehot" else LABEL_ONNX_MODEL_PATH
+        if threads is None:
+            threads = int(os.environ.get(ONNX_THREADS_ENV, "0"))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.classes_ = np.array(json.loads(metadata["classes"]))
+        if kind == "onehot":
+            self.numeric_columns = set(json.loads(metadata["numeric_columns"]))
+            self.input_names = [i.name for i in self.session.get_inputs()]
+        else:
+            # Label encoding stays in Python; the graph only holds the forest
+            self.label_encoders, self.model_features = pipelines.load_label_encoding()
+
+    def encode(self, df):
+        if self.kind == "onehot":
+            return {
+                # Numeric inputs are float64: the graph scales them like sklearn does
+                col: (df[[col]].to_numpy(dtype=np.float64) if col in self.numeric_columns
+                      else df[[col]].astype(str).to_numpy(dtype=object))
+                for col in self.input_names
+            }
+        X = pipelines.encode_labels(df, self.label_encoders, self.model_features)
+        return {"input": X.to_numpy(dtype=np.float32)}
+
+    def predict_proba_encoded(self, feed):
+        return self.session.run(["probabilities"], feed)[0]
+
+    def predict_proba(self, df):
+        return self.predict_proba_encoded(self.encode(df))
+
+    def predict(self, df):
+        return self.classes_[np.argmax(self.predict_proba(df), axis=1)]
+
+
+# --- Prediction pool protocol: 4-byte big-endian length + UTF-8 JSON ---
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def send_message(sock, message):
+    payload = json.dumps(message, default=_json_default).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(payload)) + payload)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    """Next message from sock, or None if the peer closed the connection."""
+    header = _recv_exactly(sock, 4)
+    if header is None:
+        return None
+    payload = _recv_exactly(sock, struct.unpack(">I", header)[0])
+    return None if payload is None else json.loads(payload.decode("utf-8"))
+
+
+class PoolBackend:
+    """Client of a running prediction_pool.py server.
+
+    The model stays in the pool's forked workers; this process only holds
+    what the apps need to build their forms.
+    """
+
+    name = "pool"
+
+    def __init__(self, kind="onehot", path=None, timeout=30.0):
+        self.kind = kind
+        self.path = path or os.environ.get(POOL_SOCKET_ENV, DEFAULT_POOL_SOCKET)
+        self.timeout = timeout
+        self.model = self.preprocessor = None
+        self.label_encoders = self.model_features = None
+
+        meta = self._request({"op": "meta"})
+        if meta["kind"] != kind:
+            raise ValueError(f"Prediction pool at {self.path} serves {meta['kind']!r}, not {kind!r}")
+        self.classes_ = np.array(meta["classes"])
+        if kind == "label":
+            self.label_encoders, self.model_features = pipelines.load_label_encoding()
+
+    def _request(self, message):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            send_message(sock, message)
+            response = recv_message(sock)
+        if response is None:
+            raise ConnectionError(f"Prediction pool at {self.path} closed the connection")
+        if "error" in response:
+            raise RuntimeError(f"Prediction pool error: {response['error']}")
+        return response
+
+    def encode(self, df):
+        # Raw rows go to the workers, which encode them with their own copy of the bundle
+        return {"columns": list(df.columns), "data": df.to_numpy(dtype=object).tolist()}
+
+    def predict_proba_encoded(self, rows):
+        return np.array(self._request({"op": "predict_proba", **rows})["proba"])
+
+    def predict_proba(self, df):
+        return self.predict_proba_encoded(self.encode(df))
+
+    def predict(self, df):
+        return self.classes_[np.argmax(self.predict_proba(df), axis=1)]
+
+
+BACKENDS = {
+    "sklearn": SklearnBackend,
+    "onnx": OnnxBackend,
+    "pool": PoolBackend,
+}
+
+
+def get_backend(kind="onehot", name=None):
+    """Backend named by HEARTGUARD_BACKEND (or name) for the given pipeline kind."""
+    name = name or os.environ.get(BACKEND_ENV, "sklearn")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}; choose from {sorted(BACKENDS)}")
+    return BACKENDS[name](kind)
@@ -0,0 +1,112 @@
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import pipelines
+
+# Single-row scoring for app.py's live sidebar estimate, which re-scores on
+# every widget change and has to stay within a few milliseconds:
+#
+#   HEARTGUARD_LIVE_BUDGET_MS=10 HEARTGUARD_LIVE_DEBOUNCE_MS=150 streamlit run app.py
+#
+# With the sklearn backend the inputs dict is label-encoded straight into a
+# float32 row (the dtype the forest casts to anyway) and the trees are summed
+# directly, skipping the DataFrame round trip, input validation and the
+# joblib dispatch of RandomForestClassifier.predict_proba. Other backends
+# go through their usual predict_proba.
+LIVE_BUDGET_ENV = "HEARTGUARD_LIVE_BUDGET_MS"
+LIVE_DEBOUNCE_ENV = "HEARTGUARD_LIVE_DEBOUNCE_MS"
+
+
+def live_budget_ms():
+    return float(os.environ.get(LIVE_BUDGET_ENV, "10"))
+
+
+def live_debounce_seconds():
+    return float(os.environ.get(LIVE_DEBOUNCE_ENV, "150")) / 1000
+
+
+class RowScorer:
+    """predict_proba for one app.py inputs dict, same result as the backend's."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._fast = None
+
+    def _fast_path(self):
+        """(model, trees, columns) for the backend's current model, or None."""
+        # With hot reload, take model and encoders from the same live version
+        source = getattr(self.backend, "current", self.backend)
+        model = source.model
+        if source.kind != "label" or not hasattr(model, "estimators_"):
+            return None
+        if self._fast is None or self._fast[0] is not model:
+            # Rebuilt when the model is swapped (artifact_watcher.HotReloadingBackend).
+            # (column, position, value -> code) with None for numeric columns; codes
+            # are positions in the sorted classes_, unseen values map to 0 as in
+            # pipelines.encode_labels.
+            columns = [
+                (col, i, {value: code for code, value in enumerate(source.label_encoders[col].classes_)}
+                 if col in source.label_encoders else None)
+                for i, col in enumerate(source.model_features)
+            ]
+            self._fast = (model, model.estimators_, columns)
+        return self._fast
+
+    @staticmethod
+    def encode(inputs, columns):
+        row = np.empty((1, len(columns)), dtype=np.float32)
+        for col, i, codes in columns:
+            row[0, i] = codes.get(inputs[col], 0) if codes is not None else inputs[col]
+        return row
+
+    def predict_proba(self, inputs):
+        fast = self._fast_path()
+        if fast is None:
+            return self.backend.predict_proba(pd.DataFrame([inputs]))[0]
+        _, trees, columns = fast
+        row = self.encode(inputs, columns)
+        # What RandomForestClassifier.predict_proba computes, minus its overhead
+        proba = trees[0].predict_proba(row, check_input=False)
+        for tree in trees[1:]:
+            proba += tree.predict_proba(row, check_input=False)
+        return proba[0] / len(trees)
+
+    def risk(self, inputs):
+        """(probability of the positive class, predicted class)."""
+        classes = self.backend.classes_
+        proba = self.predict_proba(inputs)
+        positive_idx = int(np.flatnonzero(classes == pipelines.positive_label(self.backend.kind))[0])
+        return float(proba[positive_idx]), classes[np.argmax(proba)]
+
+
+class LatencyGuard:
+    """Trips once the median of the last window live predictions exceeds budget_ms.
+
+    The median keeps a single slow rerun (first call, GC pause) from
+    switching a session out of live mode.
+    """
+
+    def __init__(self, budget_ms=10.0, window=5):
+        self.budget_ms = budget_ms
+        self.latencies_ms = deque(maxlen=window)
+        self.tripped = False
+
+    def record(self, latency_ms):
+        self.latencies_ms.append(latency_ms)
+        if len(self.latencies_ms) == self.latencies_ms.maxlen and self.median_ms() > self.budget_ms:
+            self.tripped = True
+        return self.tripped
+
+    def median_ms(self):
+        return float(np.median(self.latencies_ms)) if self.latencies_ms else 0.0
+
+
+def timed_risk(scorer, inputs):
+    """scorer.risk(inputs) plus its latency in milliseconds."""
+    start = time.perf_counter()
+    probability, prediction = scorer.risk(inputs)
+    return probability, prediction, (time.perf_counter() - start) * 1000
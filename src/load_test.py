@@ -0,0 +1,244 @@
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from form_options import STATES_BY_REGION, random_profile
+from resource_usage import ResourceSampler
+
+# Offline load generator for the assessment form. Replays random form
+# submissions either straight through the prediction backend (--target predict)
+# or through full App.py reruns via Streamlit's AppTest (--target app):
+#
+#   python load_test.py --target predict --concurrency 16 --duration 30
+#   python load_test.py --target app --concurrency 8 --rate 2 --duration 60
+#
+# --rate switches from closed-loop (each worker submits again as soon as its
+# previous request finished) to open-loop Poisson arrivals at that many
+# requests per second, with --concurrency bounding the requests in flight.
+
+# App.py widget labels for each input_dict column
+APP_WIDGET_LABELS = {
+    "Sex": "Sex",
+    "AgeCategory": "Age Category",
+    "State": "State",
+    "WeightInKilograms": "Weight (kg)",
+    "HeightInMeters": "Height (m)",
+    "GeneralHealth": "General Health",
+    "HadStroke": "Had Stroke",
+    "HadAngina": "Had Angina",
+    "SmokerStatus": "Smoker Status",
+    "RemovedTeeth": "Removed Teeth",
+    "TetanusLast10Tdap": "Tetanus Vaccine Last 10 Years",
+    "SleepHours": "Average Sleep Hours per Day",
+    "PhysicalHealthDays": "Days with Physical Health Issues (Last 30 Days)",
+    "MentalHealthDays": "Days with Mental Health Issues (Last 30 Days)",
+}
+REGION_OF_STATE = {state: region for region, states in STATES_BY_REGION.items() for state in states}
+
+
+# --- Targets ---
+class PredictTarget:
+    """One-row prediction exactly as App.py does it, timed per stage."""
+
+    def __init__(self, backend_name=None):
+        from inference_backends import get_backend
+        from micro_batching import maybe_micro_batched
+
+        # Batched like App.py when HEARTGUARD_MICROBATCH_MS is set
+        self.backend = maybe_micro_batched(get_backend("onehot", backend_name))
+
+    def __call__(self, profile):
+        stages = {}
+        start = time.perf_counter()
+        df_input = pd.DataFrame([profile])
+        stages["frame"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        X = self.backend.encode(df_input)
+        stages["encode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.backend.predict_proba_encoded(X)
+        stages["predict_proba"] = time.perf_counter() - start
+        return stages
+
+
+class AppTarget:
+    """A full App.py session: initial run, then filling in and submitting the form."""
+
+    def __init__(self, script="App.py", timeout=60):
+        self.script = script
+        self.timeout = timeout
+
+    def _widget(self, widgets, label):
+        return next(w for w in widgets if w.label == label)
+
+    def _submit(self, at):
+        self._widget(at.button, "🔍 Assess My Heart Attack Risk").click()
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    def __call__(self, profile):
+        from streamlit.testing.v1 import AppTest
+
+        stages = {}
+        start = time.perf_counter()
+        at = AppTest.from_file(self.script, default_timeout=self.timeout)
+        at.run()
+        stages["initial_run"] = time.perf_counter() - start
+
+        # Region and State sit in the same st.form, so State only gets the
+        # region's options after a submit: pick the region and submit once
+        start = time.perf_counter()
+        self._widget(at.selectbox, "Region").set_value(REGION_OF_STATE[profile["State"]])
+        self._submit(at)
+        stages["region_submit_run"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for col, label in APP_WIDGET_LABELS.items():
+            for widgets in (at.selectbox, at.number_input, at.slider):
+                matches = [w for w in widgets if w.label == label]
+                if matches:
+                    matches[0].set_value(profile[col])
+                    break
+        self._submit(at)
+        stages["submit_run"] = time.perf_counter() - start
+        return stages
+
+
+# --- Load generation ---
+def run_load(target, concurrency=8, duration=30.0, rate=None, seed=42, warmup=1):
+    """Drive target with random profiles and collect per-request results."""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        target(random_profile(rng))
+
+    results = []
+    lock = threading.Lock()
+
+    def one_request(profile, scheduled):
+        start = time.perf_counter()
+        error = None
+        stages = {}
+        try:
+            stages = target(profile)
+        except Exception as exc:
+            error = repr(exc)
+        end = time.perf_counter()
+        with lock:
+            results.append({
+                "end": end,
+                "latency": end - start,
+                # Time spent waiting for a free worker (open-loop only)
+                "queued": start - scheduled,
+                "stages": stages,
+                "error": error,
+            })
+
+    sampler = ResourceSampler()
+    sampler.start()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    if rate:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_arrival = started
+            while next_arrival < deadline:
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                pool.submit(one_request, random_profile(rng), next_arrival)
+                next_arrival += rng.expovariate(rate)
+    else:
+        profile_lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() < deadline:
+                with profile_lock:
+                    profile = random_profile(rng)
+                one_request(profile, time.perf_counter())
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+    return summarize(results, elapsed, started, sampler.samples)
+
+
+def summarize(results, elapsed, started, resource_samples):
+    ok = [r for r in results if r["error"] is None]
+    latencies_ms = np.array([r["latency"] for r in ok]) * 1000
+    queued_ms = np.array([r["queued"] for r in results]) * 1000
+
+    summary = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+    }
+    if len(ok):
+        summary["latency_ms"] = {
+            "mean": round(float(latencies_ms.mean()), 2),
+            **{f"p{q}": round(float(np.percentile(latencies_ms, q)), 2) for q in (50, 90, 95, 99)},
+            "max": round(float(latencies_ms.max()), 2),
+        }
+        stage_names = sorted({name for r in ok for name in r["stages"]})
+        summary["stage_mean_ms"] = {
+            name: round(1000 * float(np.mean([r["stages"].get(name, 0.0) for r in ok])), 3)
+            for name in stage_names
+        }
+    if len(queued_ms):
+        summary["queued_ms_p95"] = round(float(np.percentile(queued_ms, 95)), 2)
+
+    # Per-second completions and errors next to the resource samples
+    timeline = {}
+    for r in results:
+        second = int(r["end"] - started)
+        bucket = timeline.setdefault(second, {"t": second, "completed": 0, "errors": 0})
+        bucket["completed" if r["error"] is None else "errors"] += 1
+    summary["timeline"] = [timeline[s] for s in sorted(timeline)]
+    summary["resources"] = resource_samples
+    errors = sorted({r["error"] for r in results if r["error"]})
+    if errors:
+        summary["error_samples"] = errors[:5]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the heart attack risk assessment")
+    parser.add_argument("--target", choices=["predict", "app"], default="predict")
+    parser.add_argument("--backend", help="Inference backend for --target predict (default: HEARTGUARD_BACKEND)")
+    parser.add_argument("--script", default="App.py", help="Streamlit script for --target app")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate in requests/second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    target = PredictTarget(args.backend) if args.target == "predict" else AppTarget(args.script)
+    report = run_load(target, concurrency=args.concurrency, duration=args.duration,
+                      rate=args.rate, seed=args.seed)
+    report.update(target=args.target, concurrency=args.concurrency, rate=args.rate)
+    if hasattr(getattr(target, "backend", None), "metrics"):
+        report["micro_batching"] = target.backend.metrics()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
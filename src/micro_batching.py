@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+# Process-wide micro-batching of predictions. Sessions that submit within a
+# short window of each other (or until max_batch_size requests are waiting)
+# are scored with one transform + predict_proba call, and each gets its own
+# rows back. Enable it for the apps with
+#
+#   HEARTGUARD_MICROBATCH_MS=3 HEARTGUARD_MICROBATCH_MAX=64 streamlit run App.py
+#
+# and open the app with ?metrics=1 to see batch sizes and queueing delays.
+WINDOW_ENV = "HEARTGUARD_MICROBATCH_MS"
+MAX_BATCH_ENV = "HEARTGUARD_MICROBATCH_MAX"
+
+
+class PredictionDispatcher:
+    """Wraps a backend; predict_proba calls from any thread are batched."""
+
+    def __init__(self, backend, window_ms=3.0, max_batch_size=64, history=10_000):
+        self.backend = backend
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.name = f"{backend.name}+microbatch"
+        self.kind = backend.kind
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=history)
+        self._queue_delays = deque(maxlen=history)
+        self._batch_seconds = deque(maxlen=history)
+        self._batches = self._requests = 0
+        threading.Thread(target=self._run, name="prediction-dispatcher", daemon=True).start()
+
+    def __getattr__(self, name):
+        # classes_, model, preprocessor, ... come from the wrapped backend, which
+        # may swap them (artifact_watcher.HotReloadingBackend)
+        return getattr(self.backend, name)
+
+    def encode(self, df):
+        # Encoding happens once per batch, in the dispatcher thread
+        return df
+
+    def predict_proba_encoded(self, df):
+        future = Future()
+        self._queue.put((df, time.perf_counter(), future))
+        return future.result()
+
+    def predict_proba(self, df):
+        return self.predict_proba_encoded(df)
+
+    def predict(self, df):
+        return self.classes_[np.argmax(self.predict_proba(df), axis=1)]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                frames = [df for df, _, _ in batch]
+                proba = self.backend.predict_proba(pd.concat(frames, ignore_index=True))
+                offsets = np.cumsum([0] + [len(df) for df in frames])
+                for (_, _, future), start, end in zip(batch, offsets[:-1], offsets[1:]):
+                    future.set_result(proba[start:end])
+            except Exception as exc:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+            finished = time.perf_counter()
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes.append(len(batch))
+                self._batch_seconds.append(finished - started)
+                self._queue_delays.extend(started - enqueued for _, enqueued, _ in batch)
+
+    def metrics(self):
+        """Batch size and queueing delay statistics over the recent history."""
+        with self._lock:
+            sizes = np.array(self._batch_sizes)
+            delays_ms = np.array(self._queue_delays) * 1000
+            batch_ms = np.array(self._batch_seconds) * 1000
+            totals = {"batches": self._batches, "requests": self._requests}
+
+        def percentiles(values):
+            if not len(values):
+                return {}
+            return {"mean": round(float(values.mean()), 3),
+                    **{f"p{q}": round(float(np.percentile(values, q)), 3) for q in (50, 95, 99)},
+                    "max": round(float(values.max()), 3)}
+
+        return {
+            **totals,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "pending": self._queue.qsize(),
+            "batch_size": percentiles(sizes),
+            "queue_delay_ms": percentiles(delays_ms),
+            "batch_predict_ms": percentiles(batch_ms),
+        }
+
+
+def maybe_micro_batched(backend):
+    """backend wrapped in a PredictionDispatcher when HEARTGUARD_MICROBATCH_MS > 0."""
+    window_ms = float(os.environ.get(WINDOW_ENV, "0"))
+    if window_ms <= 0:
+        return backend
+    return PredictionDispatcher(backend, window_ms, int(os.environ.get(MAX_BATCH_ENV, "64")))
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import random
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import pipelines
+from form_options import random_profile
+
+# "People like this patient": the k survey records most similar to a
+# profile, and how many of them had a heart attack. Similarity is forest
+# leaf co-occurrence - the share of model.pkl's trees that put the two
+# records in the same leaf - so it follows what the deployed model
+# considers alike. Built offline, one inverted leaf -> rows list per tree:
+#
+#   python neighbor_index.py build --data heart_2022_no_nans.csv
+#   python neighbor_index.py bench --queries 200
+#
+# The index stores checksums of model.pkl and preprocessor.pkl and refuses
+# to load next to different ones; rebuild it whenever they are retrained.
+
+INDEX_PATH = "neighbor_index.joblib"
+INDEX_VERSION = 1
+
+
+class StaleIndexError(RuntimeError):
+    pass
+
+
+def artifact_fingerprint(model_path=pipelines.MODEL_PATH, preprocessor_path=pipelines.PREPROCESSOR_PATH):
+    return {os.path.basename(path): pipelines.file_sha256(path) for path in (model_path, preprocessor_path)}
+
+
+def build_index(df, model, preprocessor, fingerprint, chunksize=50_000):
+    """Leaf postings of every row of df in every tree of model."""
+    n_trees = len(model.estimators_)
+    leaves = np.empty((len(df), n_trees), dtype=np.int32)
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        leaves[start:start + len(chunk)] = model.apply(pipelines.encode_onehot(chunk, preprocessor))
+
+    order = np.empty((n_trees, len(df)), dtype=np.int32)
+    starts, start_offsets = [], [0]
+    for t, estimator in enumerate(model.estimators_):
+        # Rows sorted by leaf; starts[leaf]:starts[leaf + 1] is that leaf's slice of order
+        order[t] = np.argsort(leaves[:, t], kind="stable")
+        tree_starts = np.searchsorted(leaves[order[t], t], np.arange(estimator.tree_.node_count + 1))
+        starts.append(tree_starts.astype(np.int32))
+        start_offsets.append(start_offsets[-1] + len(tree_starts))
+
+    records = df[pipelines.APP_FEATURES + [pipelines.TARGET]].reset_index(drop=True)
+    for col in records.select_dtypes(exclude="number").columns:
+        records[col] = records[col].astype("category")
+    return {
+        "version": INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "order": order,
+        "starts": np.concatenate(starts),
+        "start_offsets": np.array(start_offsets, dtype=np.int64),
+        "records": records,
+    }
+
+
+class NeighborIndex:
+    def __init__(self, index, model, preprocessor):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.order = index["order"]
+        self.starts = index["starts"]
+        self.start_offsets = index["start_offsets"]
+        self.records = index["records"]
+        self.outcomes = (self.records[pipelines.TARGET] == "Yes").to_numpy()
+
+    def query(self, df, k=25):
+        """The k records most similar to the first row of df.
+
+        Returns (records with a "Similarity" column, share of them with
+        HadHeartAttack == "Yes").
+        """
+        leaves = self.model.apply(pipelines.encode_onehot(df.iloc[:1], self.preprocessor))[0]
+        postings = []
+        for t, leaf in enumerate(leaves):
+            offset = self.start_offsets[t]
+            postings.append(self.order[t, self.starts[offset + leaf]:self.starts[offset + leaf + 1]])
+        rows, counts = np.unique(np.concatenate(postings), return_counts=True)
+        top = np.argsort(-counts, kind="stable")[:k]
+        neighbors = self.records.iloc[rows[top]].copy()
+        neighbors["Similarity"] = counts[top] / len(leaves)
+        return neighbors, float(self.outcomes[rows[top]].mean())
+
+
+def load_index(path=INDEX_PATH, model=None, preprocessor=None, fingerprint=None):
+    """NeighborIndex for the current model.pkl/preprocessor.pkl.
+
+    fingerprint is artifact_fingerprint() of the files model and
+    preprocessor were loaded from, when those may no longer be the files on
+    disk (hot reload). Raises StaleIndexError if the index was built from
+    other artifacts.
+    """
+    index = joblib.load(path, mmap_mode="r")
+    if index["version"] != INDEX_VERSION:
+        raise StaleIndexError(f"{path} has format version {index['version']}, expected {INDEX_VERSION}")
+    current = fingerprint or artifact_fingerprint()
+    if index["fingerprint"] != current:
+        raise StaleIndexError(f"{path} was built for other model artifacts; rebuild it with neighbor_index.py build")
+    if model is None or preprocessor is None:
+        model, preprocessor = pipelines.load_onehot_bundle()
+    return NeighborIndex(index, model, preprocessor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similar-profile index over the survey records")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--data", default="heart_2022_no_nans.csv")
+    build.add_argument("--max-rows", type=int, help="Index a random subset of this many rows")
+    build.add_argument("--out", default=INDEX_PATH)
+    bench = sub.add_parser("bench")
+    bench.add_argument("--index", default=INDEX_PATH)
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        df = pd.read_csv(args.data, usecols=pipelines.APP_FEATURES + [pipelines.TARGET])
+        if args.max_rows and args.max_rows < len(df):
+            df = df.sample(n=args.max_rows, random_state=42)
+        model, preprocessor = pipelines.load_onehot_bundle()
+        start = time.perf_counter()
+        index = build_index(df, model, preprocessor, artifact_fingerprint())
+        joblib.dump(index, args.out)
+        print(json.dumps({"rows": len(df), "trees": len(model.estimators_),
+                          "build_s": round(time.perf_counter() - start, 2), "path": args.out}, indent=2))
+    else:
+        index = load_index(args.index)
+        rng = random.Random(42)
+        timings = []
+        for _ in range(args.queries):
+            df = pd.DataFrame([random_profile(rng)])
+            start = time.perf_counter()
+            index.query(df, args.k)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(json.dumps({"queries": args.queries, "k": args.k,
+                          **{f"p{q}_ms": round(float(np.percentile(timings, q)), 2) for q in (50, 95, 99)}},
+                         indent=2))
+
+
+if __name__ == "__main__":
+    main()
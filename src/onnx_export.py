@@ -0,0 +1,134 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+import onnx
+import pandas as pd
+from onnx import TensorProto, compose, helper
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import DoubleTensorType, FloatTensorType, StringTensorType
+
+import pipelines
+from inference_backends import LABEL_ONNX_MODEL_PATH, ONNX_MODEL_PATH, OnnxBackend, SklearnBackend
+
+# Export the deployed pipelines to ONNX and check probability parity against
+# the sklearn originals:
+#
+#   python onnx_export.py --parity-data heart_2022_no_nans.csv
+#
+# Writes model.onnx (preprocessor.pkl + model.pkl, for App.py) and
+# best_heart_model.onnx (best_heart_model.pkl, for app.py). Select them at
+# runtime with HEARTGUARD_BACKEND=onnx.
+
+
+def _add_metadata(onx, **entries):
+    for key, value in entries.items():
+        prop = onx.metadata_props.add()
+        prop.key = key
+        prop.value = json.dumps(value)
+
+
+def _classes(model):
+    return [c.item() if isinstance(c, np.generic) else c for c in model.classes_]
+
+
+def export_onehot(model, preprocessor, path=ONNX_MODEL_PATH):
+    """preprocessor.pkl + model.pkl as one graph taking one input per raw column.
+
+    As in sklearn, the preprocessor runs in float64 and only its output is
+    cast to float32 for the trees; scaling in float32 moves values across
+    split thresholds.
+    """
+    numeric = pipelines.numeric_columns(preprocessor)
+    initial_types = [
+        (col, DoubleTensorType([None, 1]) if col in numeric else StringTensorType([None, 1]))
+        for col in preprocessor.feature_names_in_
+    ]
+    n_features = len(preprocessor.get_feature_names_out())
+    encoder = convert_sklearn(preprocessor, initial_types=initial_types)
+    forest = convert_sklearn(model, initial_types=[("features", FloatTensorType([None, n_features]))],
+                             options={id(model): {"zipmap": False}})
+
+    encoded = encoder.graph.output[0].name
+    encoder.graph.node.append(helper.make_node("Cast", [encoded], ["features_float"], to=TensorProto.FLOAT))
+    del encoder.graph.output[:]
+    encoder.graph.output.append(
+        helper.make_tensor_value_info("features_float", TensorProto.FLOAT, [None, n_features]))
+    # Prefix the forest's names so they cannot clash with the encoder's, then
+    # give its outputs back the names OnnxBackend asks for
+    forest = compose.add_prefix(forest, "forest_")
+    onx = compose.merge_models(encoder, forest, io_map=[("features_float", "forest_features")])
+    for output in onx.graph.output:
+        name = output.name[len("forest_"):]
+        onx.graph.node.append(helper.make_node("Identity", [output.name], [name]))
+        output.name = name
+    _add_metadata(onx, classes=_classes(model), numeric_columns=numeric)
+    onnx.save(onx, path)
+    return path
+
+
+def export_label(model, model_features, path=LABEL_ONNX_MODEL_PATH):
+    """best_heart_model.pkl as a graph over the label-encoded feature matrix."""
+    initial_types = [("input", FloatTensorType([None, len(model_features)]))]
+    onx = convert_sklearn(model, initial_types=initial_types, options={id(model): {"zipmap": False}})
+    _add_metadata(onx, classes=_classes(model), model_features=list(model_features))
+    onnx.save(onx, path)
+    return path
+
+
+def check_parity(reference, candidate, df, atol=1e-4):
+    """Compare predict_proba of two backends on the same raw rows.
+
+    Any difference in how the inputs reach the trees (a preprocessing step
+    run in float32 instead of float64, a cast in a different place) sends
+    some rows down other branches. Those rows show up in mismatch_rate, and
+    the check fails once it exceeds --max-mismatch-rate.
+    """
+    expected = reference.predict_proba(df)
+    actual = candidate.predict_proba(df)
+    diff = np.abs(expected - actual).max(axis=1)
+    return {
+        "rows": int(len(df)),
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "mismatch_rate": float(np.mean(diff > atol)),
+        "label_agreement": float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the deployed models to ONNX with parity checks")
+    parser.add_argument("--pipeline", choices=["onehot", "label", "both"], default="both")
+    parser.add_argument("--parity-data", default="heart_2022_no_nans.csv",
+                        help="CSV of raw survey rows used for the parity check")
+    parser.add_argument("--parity-rows", type=int, default=10000)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--max-mismatch-rate", type=float, default=0.001,
+                        help="Largest share of rows allowed to differ by more than --atol")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.parity_data)
+    df = df.sample(n=min(args.parity_rows, len(df)), random_state=42)
+
+    kinds = ["onehot", "label"] if args.pipeline == "both" else [args.pipeline]
+    failed = False
+    for kind in kinds:
+        reference = SklearnBackend(kind)
+        if kind == "onehot":
+            path = export_onehot(reference.model, reference.preprocessor)
+        else:
+            path = export_label(reference.model, reference.model_features)
+
+        report = check_parity(reference, OnnxBackend(kind, path=path), df, atol=args.atol)
+        report.update(pipeline=kind, path=path)
+        report["passed"] = (report["mismatch_rate"] <= args.max_mismatch_rate
+                            and report["label_agreement"] >= 1 - args.max_mismatch_rate)
+        failed |= not report["passed"]
+        print(json.dumps(report, indent=2))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import copy
+import hashlib
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+
+# --- Artifact locations (relative to the app folder, same as App.py / app.py) ---
+MODEL_PATH = "model.pkl"
+PREPROCESSOR_PATH = "preprocessor.pkl"
+LABEL_MODEL_PATH = "best_heart_model.pkl"
+LABEL_ENCODERS_PATH = "label_encoders_heart_attack.joblib"
+MODEL_FEATURES_PATH = "model_features.pkl"
+TARGET_ENCODER_PATH = "target_encoder.pkl"
+
+TARGET = "HadHeartAttack"
+
+# Per-class sample sizes used by Machine.ipynb (one-hot) and Machine Model.ipynb (label)
+ONEHOT_SAMPLE_SIZE = 13435
+LABEL_SAMPLE_SIZE = 13000
+
+# Columns collected by the App.py form, in the order it builds input_dict
+APP_FEATURES = [
+    "HadAngina", "BMI", "WeightInKilograms", "HeightInMeters", "AgeCategory",
+    "SleepHours", "PhysicalHealthDays", "TetanusLast10Tdap", "GeneralHealth",
+    "MentalHealthDays", "RemovedTeeth", "SmokerStatus", "HadStroke", "Sex", "State"
+]
+
+
+# --- Loading ---
+def load_onehot_bundle(model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH):
+    """Model and ColumnTransformer used by App.py."""
+    model = joblib.load(model_path)
+    preprocessor = joblib.load(preprocessor_path)
+    return model, preprocessor
+
+
+def load_label_encoding(encoders_path=LABEL_ENCODERS_PATH, features_path=MODEL_FEATURES_PATH):
+    """Label encoders and feature order used by app.py, without the model."""
+    label_encoders = joblib.load(encoders_path)
+    model_features = joblib.load(features_path)
+    return label_encoders, model_features
+
+
+def load_label_bundle(model_path=LABEL_MODEL_PATH, encoders_path=LABEL_ENCODERS_PATH,
+                      features_path=MODEL_FEATURES_PATH):
+    """Model, label encoders and feature order used by app.py."""
+    model = joblib.load(model_path)
+    label_encoders, model_features = load_label_encoding(encoders_path, features_path)
+    return model, label_encoders, model_features
+
+
+def load_target_encoder(path=TARGET_ENCODER_PATH):
+    return joblib.load(path)
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Encoding ---
+def numeric_columns(preprocessor):
+    """Columns routed to the MinMaxScaler branch of preprocessor.pkl."""
+    for name, _, cols in preprocessor.transformers_:
+        if name == "numerical_pipe":
+            return list(cols)
+    return []
+
+
+def compact_preprocessor(preprocessor):
+    """Copy of a fitted preprocessor.pkl whose one-hot block comes out sparse.
+
+    The one-hot columns (State alone is ~50 of them) are then never
+    materialised as dense float64; encode_onehot(..., compact=True) turns the
+    result into float32 CSR.
+    """
+    preprocessor = copy.deepcopy(preprocessor)
+    for name, transformer, _ in preprocessor.transformers_:
+        if name == "categorical_pipe":
+            encoder = transformer.named_steps["encoder"]
+            encoder.set_params(sparse_output=True, dtype=np.float32)
+    preprocessor.sparse_output_ = True
+    return preprocessor
+
+
+def encode_onehot(df, preprocessor, compact=False):
+    """Run App.py's preprocessing on a whole frame.
+
+    compact=True returns a float32 CSR matrix, the dtype the trees work in,
+    instead of dense float64.
+    """
+    X = preprocessor.transform(df[list(preprocessor.feature_names_in_)])
+    if compact:
+        X = sparse.csr_matrix(X, dtype=np.float32)
+    return X
+
+
+def encode_labels(df, label_encoders, model_features, compact=False):
+    """Column-wise equivalent of app.py's preprocess_input for a whole frame.
+
+    LabelEncoder classes_ are sorted, so a value's position in classes_ is its
+    code. Unseen values fall back to classes_[0], as in app.py. compact=True
+    builds every column as float32, which sklearn uses without another copy.
+    """
+    dtype = np.float32 if compact else None
+    encoded = {}
+    for col in model_features:
+        if col in label_encoders:
+            codes = pd.Index(label_encoders[col].classes_).get_indexer(df[col])
+            codes[codes < 0] = 0
+            encoded[col] = codes.astype(dtype) if compact else codes
+        else:
+            encoded[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=dtype)
+    return pd.DataFrame(encoded, index=df.index, columns=model_features)
+
+
+def encode_batch(df, kind, bundle, target_encoder=None, compact=False):
+    """Features (and target, when present) for either deployed pipeline.
+
+    kind is "onehot" (App.py: model.pkl + preprocessor.pkl) or "label"
+    (app.py: best_heart_model.pkl + label encoders). bundle is what the
+    matching load_*_bundle returned.
+    """
+    if kind == "onehot":
+        _, preprocessor = bundle
+        X = encode_onehot(df, preprocessor, compact)
+        y = df[TARGET].to_numpy() if TARGET in df else None
+    elif kind == "label":
+        _, label_encoders, model_features = bundle
+        X = encode_labels(df, label_encoders, model_features, compact)
+        y = None
+        if TARGET in df:
+            if target_encoder is None:
+                target_encoder = load_target_encoder()
+            y = target_encoder.transform(df[TARGET])
+    else:
+        raise ValueError(f"Unknown pipeline kind: {kind!r}")
+    return X, y
+
+
+def positive_label(kind):
+    """Class value the models use for HadHeartAttack == "Yes"."""
+    return "Yes" if kind == "onehot" else 1
+
+
+# --- Sampling ---
+def balanced_sample(df, sample_size, random_state=42):
+    """Same "Yes"/"No" downsampling the training notebooks do."""
+    yes_sample = df[df[TARGET] == "Yes"].sample(n=sample_size, random_state=random_state)
+    no_sample = df[df[TARGET] == "No"].sample(n=sample_size, random_state=random_state)
+    balanced = pd.concat([yes_sample, no_sample])
+    return balanced.sample(frac=1, random_state=random_state).reset_index(drop=True)
+
+
+def positive_proba(model, X, positive):
+    """Probability column for the positive class."""
+    idx = int(np.flatnonzero(model.classes_ == positive)[0])
+    return model.predict_proba(X)[:, idx]
+
+
+# --- Training (Machine.ipynb) ---
+# RandomizedSearchCV space from Machine.ipynb. max_features='auto' is gone:
+# it was an alias of 'sqrt' for classifiers and was removed in scikit-learn 1.3.
+PARAM_DIST = {
+    'n_estimators': [100, 200, 300, 400, 500],
+    'max_depth': [None, 10, 20, 30, 40, 50],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2'],
+    'bootstrap': [True, False]
+}
+
+# Final forest hyperparameters chosen in Machine.ipynb
+RF_PARAMS = dict(n_estimators=100, min_samples_split=5, min_samples_leaf=4,
+                 max_features='sqrt', max_depth=40, bootstrap=True, random_state=42)
+
+
+def build_preprocessor(X, compact=False):
+    """Unfitted ColumnTransformer laid out like preprocessor.pkl.
+
+    compact=True makes it emit sparse output (see compact_preprocessor).
+    """
+    categorical_cols = X.select_dtypes(exclude='number').columns.tolist()
+    numerical_cols = X.select_dtypes(include='number').columns.tolist()
+    encoder = (OneHotEncoder(drop='first', sparse_output=True, dtype=np.float32, handle_unknown='ignore')
+               if compact else OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'))
+    return ColumnTransformer([
+        ('numerical_pipe', Pipeline([('scaler', MinMaxScaler())]), numerical_cols),
+        ('categorical_pipe', Pipeline([('encoder', encoder)]), categorical_cols)
+    ], sparse_threshold=1.0 if compact else 0.3)
+
+
+def training_split(df, features=APP_FEATURES, sample_size=ONEHOT_SAMPLE_SIZE, random_state=42):
+    """x_train, x_test, y_train, y_test as Machine.ipynb builds them.
+
+    sample_size=None keeps every row instead of the balanced downsample.
+    """
+    df = df[list(features) + [TARGET]]
+    if sample_size is not None:
+        df = balanced_sample(df, sample_size, random_state=random_state)
+    X = df.drop(TARGET, axis=1)
+    y = df[TARGET]
+    return train_test_split(X, y, test_size=0.2, random_state=random_state)
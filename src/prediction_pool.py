@@ -0,0 +1,140 @@
+import os
+
+# Keep native thread pools (OpenMP, BLAS) single-threaded: they don't survive
+# fork(), and parallelism here comes from the worker processes instead.
+# This has to happen before numpy/sklearn are imported.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse
+import gc
+import signal
+import socket
+import sys
+
+import pandas as pd
+
+from form_options import random_profile
+from inference_backends import DEFAULT_POOL_SOCKET, POOL_SOCKET_ENV, SklearnBackend, recv_message, send_message
+
+# Pre-fork prediction server. The master loads the sklearn artifacts once,
+# warms them up, moves every object into the GC's permanent generation and
+# forks N workers. The workers share the model's memory pages copy-on-write
+# and take turns accepting requests on one Unix socket, so concurrent
+# sessions are predicted in parallel instead of serializing on one GIL:
+#
+#   python prediction_pool.py --kind onehot --workers 4
+#   HEARTGUARD_BACKEND=pool streamlit run App.py
+#
+# Dead workers are replaced; SIGTERM/SIGINT stops the pool.
+
+
+def _warmup_frame(backend):
+    if backend.kind == "onehot":
+        return pd.DataFrame([random_profile()])
+    row = {col: (backend.label_encoders[col].classes_[0] if col in backend.label_encoders else 0)
+           for col in backend.model_features}
+    return pd.DataFrame([row])
+
+
+def handle(backend, message):
+    if message.get("op") == "meta":
+        return {"kind": backend.kind, "classes": backend.classes_.tolist(), "pid": os.getpid()}
+    if message.get("op") == "predict_proba":
+        df = pd.DataFrame(message["data"], columns=message["columns"])
+        return {"proba": backend.predict_proba(df).tolist()}
+    return {"error": f"unknown op {message.get('op')!r}"}
+
+
+def worker_loop(listener, backend):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Objects frozen by the master stay untouched; only per-request garbage is collected
+    gc.enable()
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            try:
+                message = recv_message(conn)
+                if message is None:
+                    continue
+                try:
+                    response = handle(backend, message)
+                except Exception as exc:
+                    response = {"error": repr(exc)}
+                send_message(conn, response)
+            except OSError:
+                # Client went away mid-request; carry on with the next one
+                pass
+
+
+def spawn_worker(listener, backend):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            worker_loop(listener, backend)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def serve(socket_path, workers, kind="onehot"):
+    # No collections while loading, so the loaded objects are never moved
+    # around or have their GC headers written after the fork
+    gc.disable()
+    backend = SklearnBackend(kind)
+    backend.predict_proba(_warmup_frame(backend))
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    listener.listen(128)
+
+    gc.freeze()
+    children = {spawn_worker(listener, backend) for _ in range(workers)}
+    print(f"Prediction pool ({kind}) on {socket_path}: master {os.getpid()}, workers {sorted(children)}",
+          flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; starting a replacement", file=sys.stderr, flush=True)
+            children.add(spawn_worker(listener, backend))
+
+    listener.close()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork prediction pool for App.py / app.py")
+    parser.add_argument("--kind", choices=["onehot", "label"], default="onehot",
+                        help="onehot serves App.py (model.pkl), label serves app.py (best_heart_model.pkl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--socket", default=os.environ.get(POOL_SOCKET_ENV, DEFAULT_POOL_SOCKET))
+    args = parser.parse_args()
+    serve(args.socket, args.workers, args.kind)
+
+
+if __name__ == "__main__":
+    main()
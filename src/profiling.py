@@ -0,0 +1,214 @@
+import argparse
+import cProfile
+import contextlib
+import hmac
+import json
+import os
+import pstats
+import time
+import uuid
+from datetime import datetime
+
+# Opt-in profiling of a single App.py rerun or prediction. Off by default;
+# when off the apps only compare a query parameter per rerun. Turn it on for
+# every session with
+#
+#   HEARTGUARD_PROFILE=predict streamlit run App.py      # or =rerun
+#
+# or for one admin session with HEARTGUARD_PROFILE_TOKEN=<secret> set on the
+# server and the app opened as ?admin=<secret>&profile=rerun (or
+# profile=predict). Each profile is saved as profiles/<request id>.prof
+# (pstats format, e.g. for snakeviz) with a JSON summary next to it:
+#
+#   python profiling.py list
+#   python profiling.py show 20261019-101500-3f2a9c1b7d4e --top 30
+#
+# cProfile follows the calling thread only: with a forest using n_jobs > 1
+# the tree traversal shows up as time waiting on joblib's worker threads,
+# and with micro-batching as waiting on the dispatcher. Python 3.12+ allows
+# one active cProfile per process, so concurrent profiled sessions skip
+# their profile instead of failing.
+PROFILE_ENV = "HEARTGUARD_PROFILE"
+PROFILE_TOKEN_ENV = "HEARTGUARD_PROFILE_TOKEN"
+PROFILE_DIR_ENV = "HEARTGUARD_PROFILE_DIR"
+MODES = ("rerun", "predict")
+# A rerun profile still running after this long lost its rerun (see abandon_stale)
+STALE_AFTER_S = 120
+
+# Profilers enabled and not yet stopped or abandoned, by request id
+_active = {}
+
+# Where the time goes, by the file a function is defined in
+STAGES = {
+    "forest": ("sklearn/ensemble", "sklearn/tree"),
+    "transform": ("sklearn/preprocessing", "sklearn/compose", "sklearn/pipeline", "pandas/"),
+    "rendering": ("streamlit/", "plotly/"),
+}
+
+
+def profile_dir():
+    return os.environ.get(PROFILE_DIR_ENV, "profiles")
+
+
+def requested_mode(query_params):
+    """"rerun", "predict" or None for this session."""
+    mode = os.environ.get(PROFILE_ENV)
+    if mode in MODES:
+        return mode
+    token = os.environ.get(PROFILE_TOKEN_ENV)
+    if not token or query_params.get("profile") not in MODES:
+        return None
+    if not hmac.compare_digest(query_params.get("admin", "").encode(), token.encode()):
+        return None
+    return query_params.get("profile")
+
+
+def new_request_id():
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:12]}"
+
+
+def _stage(filename):
+    path = filename.replace(os.sep, "/")
+    for stage, markers in STAGES.items():
+        if any(marker in path for marker in markers):
+            return stage
+    return "other"
+
+
+def summarize(stats, top=25):
+    """Top functions by own time and own time per stage, from a pstats.Stats."""
+    rows, stages = [], {}
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        stage = _stage(filename)
+        stages[stage] = stages.get(stage, 0.0) + tottime
+        rows.append({
+            "function": function,
+            "location": f"{filename}:{line}",
+            "stage": stage,
+            "ncalls": ncalls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["tottime_ms"], reverse=True)
+    return {
+        "stage_ms": {stage: round(seconds * 1000, 3) for stage, seconds in sorted(stages.items())},
+        "top_functions": rows[:top],
+    }
+
+
+class Profiler:
+    """cProfile around one rerun or prediction, saved under a new request id."""
+
+    def __init__(self, mode, label=""):
+        self.mode = mode
+        self.label = label
+        self.request_id = new_request_id()
+        self._profile = cProfile.Profile()
+        self.active = False
+        self.summary = None
+
+    def start(self):
+        abandon_stale()
+        self._started = time.perf_counter()
+        try:
+            self._profile.enable()
+            self.active = True
+            _active[self.request_id] = self
+        except ValueError:  # another profiler is running
+            self.active = False
+        return self
+
+    def abandon(self):
+        """Disable without saving, e.g. for a rerun Streamlit cut short."""
+        if self.active:
+            self._profile.disable()
+            self.active = False
+            _active.pop(self.request_id, None)
+
+    def stop(self):
+        """Stop, save the .prof and .json files, and return the summary (None if skipped)."""
+        if not self.active:
+            return None
+        self._profile.disable()
+        self.active = False
+        _active.pop(self.request_id, None)
+        wall_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        os.makedirs(profile_dir(), exist_ok=True)
+        path = os.path.join(profile_dir(), self.request_id)
+        self._profile.dump_stats(path + ".prof")
+        self.summary = {
+            "request_id": self.request_id,
+            "mode": self.mode,
+            "label": self.label,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "wall_ms": wall_ms,
+            **summarize(pstats.Stats(self._profile)),
+        }
+        with open(path + ".json", "w") as f:
+            json.dump(self.summary, f, indent=2)
+        return self.summary
+
+
+def abandon_stale(max_age_s=STALE_AFTER_S):
+    """Disable profilers left running by reruns that never reached their stop().
+
+    Streamlit ends a rerun with an exception at the next st call when the
+    inputs change mid-run, or just drops a closed session. Their profilers
+    would otherwise keep running, and on Python 3.12+ block every later one.
+    """
+    now = time.perf_counter()
+    for profiler in list(_active.values()):
+        if now - profiler._started > max_age_s:
+            profiler.abandon()
+
+
+@contextlib.contextmanager
+def profiled(mode, wanted, label=""):
+    """Profile the block if the session asked for mode; yields the Profiler or None."""
+    if mode != wanted:
+        yield None
+        return
+    profiler = Profiler(wanted, label).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def load_summary(request_id):
+    with open(os.path.join(profile_dir(), request_id + ".json")) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Saved rerun and prediction profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    show = sub.add_parser("show")
+    show.add_argument("request_id")
+    show.add_argument("--top", type=int, default=25)
+    show.add_argument("--sort", choices=["tottime", "cumulative"], default="tottime")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        names = sorted(f[:-5] for f in os.listdir(profile_dir()) if f.endswith(".json")) \
+            if os.path.isdir(profile_dir()) else []
+        listing = []
+        for request_id in names:
+            summary = load_summary(request_id)
+            listing.append({key: summary[key] for key in ("request_id", "mode", "label", "wall_ms")})
+        print(json.dumps(listing, indent=2))
+        return
+
+    # show: re-read the full profile so any sort order and depth is available
+    stats = pstats.Stats(os.path.join(profile_dir(), args.request_id + ".prof"))
+    report = summarize(stats, top=args.top)
+    if args.sort == "cumulative":
+        report["top_functions"] = sorted(summarize(stats, top=None)["top_functions"],
+                                         key=lambda r: r["cumtime_ms"], reverse=True)[:args.top]
+    report = {"request_id": args.request_id, "wall_ms": load_summary(args.request_id)["wall_ms"], **report}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # optional: falls back to process_time / ru_maxrss
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# CPU and memory sampling shared by load_test.py and the training scripts.
+# With psutil the RSS is the current one; without it only the process-wide
+# peak so far is available (ru_maxrss), and on Windows no RSS at all.
+
+# ru_maxrss is in bytes on macOS and in KiB on Linux and the BSDs
+MAXRSS_BYTES = 1 if sys.platform == "darwin" else 1024
+# Whether the RSS of a single step can be measured (see timed)
+LIVE_RSS = psutil is not None
+
+
+def peak_rss_mb():
+    """Highest RSS this process has reached so far in MB, or None without the resource module."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_BYTES / 2 ** 20
+
+
+class ResourceSampler(threading.Thread):
+    """Samples process CPU% and RSS every interval seconds."""
+
+    def __init__(self, interval=1.0):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+        self._process = psutil.Process(os.getpid()) if psutil else None
+
+    def _rss_mb(self):
+        if self._process:
+            return self._process.memory_info().rss / 2 ** 20
+        return peak_rss_mb()
+
+    def run(self):
+        start = last_wall = time.perf_counter()
+        last_cpu = time.process_time()
+        while not self._stop_event.wait(self.interval):
+            now_wall, now_cpu = time.perf_counter(), time.process_time()
+            rss_mb = self._rss_mb()
+            self.samples.append({
+                "t": round(now_wall - start, 2),
+                "cpu_percent": round(100 * (now_cpu - last_cpu) / (now_wall - last_wall), 1),
+                "rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+            })
+            last_wall, last_cpu = now_wall, now_cpu
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def timed(func, interval=0.25):
+    """Run func() and return (result, seconds, peak RSS MB while it ran).
+
+    The peak is None without psutil: ru_maxrss never goes down, so it would
+    repeat the peak of any earlier, larger step of the same process.
+    """
+    sampler = ResourceSampler(interval=interval)
+    sampler.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = round(time.perf_counter() - start, 2)
+    sampler.stop()
+    if not LIVE_RSS:
+        return result, seconds, None
+    return result, seconds, max((s["rss_mb"] for s in sampler.samples), default=None)
@@ -0,0 +1,129 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+import pipelines
+
+# Balanced "Yes"/"No" training sample built in one streaming pass over the
+# survey CSV, instead of loading the whole file and calling .sample() per
+# class as the notebooks do:
+#
+#   python streaming_sampler.py heart_2022_no_nans.csv --sample-size 13435 --out balanced.csv
+#   python streaming_sampler.py heart_2022_no_nans.csv --sample-size 13435 --strata AgeCategory State
+#
+# Every row gets a uniform random priority from a generator seeded with
+# --seed, and each class keeps the sample_size rows with the smallest
+# priorities (bottom-k reservoir sampling). That is a uniform sample without
+# replacement, identical for the same seed and file whatever the chunk size.
+# With --strata a first, count-only pass fixes how many rows each (class,
+# stratum) pair gets, and the sampling pass keeps exactly that many per
+# pair. Either way memory is the sample itself plus one chunk.
+
+CLASSES = ("Yes", "No")
+_PRIORITY = "_priority"
+
+
+def _keep_smallest(frame, k):
+    if len(frame) <= k:
+        return frame
+    keep = np.argpartition(frame[_PRIORITY].to_numpy(), k - 1)[:k]
+    return frame.iloc[keep]
+
+
+def _allocate(counts, total):
+    """Split total across strata in proportion to counts (largest remainder)."""
+    keys = list(counts)
+    n = np.array([counts[key] for key in keys], dtype=float)
+    exact = n / n.sum() * total
+    alloc = np.floor(exact).astype(int)
+    remainder = int(total - alloc.sum())
+    alloc[np.argsort(alloc - exact, kind="stable")[:remainder]] += 1
+    return dict(zip(keys, np.minimum(alloc, n.astype(int))))
+
+
+def _check_available(label, available, sample_size):
+    if available < sample_size:
+        raise ValueError(f"Only {available} rows with {pipelines.TARGET} == {label!r}, "
+                         f"cannot sample {sample_size}")
+
+
+def _count(path, keys, chunksize):
+    """Rows per (class, *strata) key, reading only those columns."""
+    counts = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=keys):
+        chunk = chunk[chunk[pipelines.TARGET].isin(CLASSES)]
+        for key, n in chunk.groupby(keys, sort=False, observed=True).size().items():
+            key = key if isinstance(key, tuple) else (key,)
+            counts[key] = counts.get(key, 0) + int(n)
+    return counts
+
+
+def stream_balanced_sample(path, sample_size, seed=42, strata=None, chunksize=200_000, usecols=None):
+    """Balanced sample of sample_size rows per HadHeartAttack class from a CSV.
+
+    With strata (e.g. ["AgeCategory"]) each class's sample is spread over the
+    strata in proportion to how often they occur in that class; rows with a
+    missing stratum value are skipped.
+    """
+    strata = list(strata or [])
+    if usecols is not None:
+        usecols = list(dict.fromkeys(list(usecols) + [pipelines.TARGET] + strata))
+    keys = [pipelines.TARGET] + strata
+
+    # Rows to keep per (class, *strata) key; without strata no counting pass is needed
+    if strata:
+        counts = _count(path, keys, chunksize)
+        allocation = {}
+        for label in CLASSES:
+            class_counts = {key: n for key, n in counts.items() if key[0] == label}
+            _check_available(label, sum(class_counts.values()), sample_size)
+            allocation.update(_allocate(class_counts, sample_size))
+    else:
+        allocation = {(label,): sample_size for label in CLASSES}
+
+    rng = np.random.default_rng(seed)
+    reservoirs = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols):
+        # Draw for every row, even those dropped below, so priorities depend
+        # only on the row's position in the file
+        chunk[_PRIORITY] = rng.random(len(chunk))
+        chunk = chunk[chunk[pipelines.TARGET].isin(CLASSES)]
+        for key, group in chunk.groupby(keys, sort=False, observed=True):
+            key = key if isinstance(key, tuple) else (key,)
+            if not allocation.get(key):
+                continue
+            if key in reservoirs:
+                group = pd.concat([reservoirs[key], group])
+            reservoirs[key] = _keep_smallest(group, allocation[key])
+
+    if not strata:
+        for label in CLASSES:
+            _check_available(label, len(reservoirs.get((label,), ())), sample_size)
+    balanced = pd.concat(reservoirs.values()).sort_values(_PRIORITY).drop(columns=_PRIORITY)
+    return balanced.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a class-balanced training sample out of a survey CSV")
+    parser.add_argument("path")
+    parser.add_argument("--sample-size", type=int, default=pipelines.ONEHOT_SAMPLE_SIZE, help="Rows per class")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--strata", nargs="*", default=[], help="Columns to stratify by within each class")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--out", help="Write the sample to this CSV")
+    args = parser.parse_args()
+
+    sample = stream_balanced_sample(args.path, args.sample_size, seed=args.seed,
+                                    strata=args.strata, chunksize=args.chunksize)
+    if args.out:
+        sample.to_csv(args.out, index=False)
+    print(json.dumps({
+        "rows": int(len(sample)),
+        "by_class": {k: int(v) for k, v in sample[pipelines.TARGET].value_counts().items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
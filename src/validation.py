@@ -0,0 +1,126 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+import pipelines
+from form_options import NUMERIC_LIMITS, SIDEBAR_NUMERIC_LIMITS
+
+# Column-at-a-time validation of batch inputs against the vocabularies the
+# deployed encoders know and the numeric limits of the app forms. Unlike the
+# apps (unseen categories silently become classes_[0] in app.py and all-zero
+# one-hot rows in App.py), every bad cell is reported:
+#
+#   python validation.py batch.csv --pipeline onehot --errors-out bad_rows.csv
+#
+# A schema maps column -> {"categories": [...]} or {"range": (min, max)}.
+
+
+def schema_from_preprocessor(preprocessor, numeric_limits=NUMERIC_LIMITS):
+    """Schema for App.py's model: OneHotEncoder categories plus form limits."""
+    schema = {}
+    for name, transformer, cols in preprocessor.transformers_:
+        if name == "categorical_pipe":
+            encoder = transformer.named_steps["encoder"]
+            for col, categories in zip(cols, encoder.categories_):
+                schema[col] = {"categories": list(categories)}
+    for col in pipelines.numeric_columns(preprocessor):
+        schema[col] = {"range": numeric_limits.get(col, (-np.inf, np.inf))}
+    return schema
+
+
+def schema_from_label_encoders(label_encoders, model_features, numeric_limits=SIDEBAR_NUMERIC_LIMITS):
+    """Schema for app.py's model: LabelEncoder classes plus sidebar limits."""
+    schema = {}
+    for col in model_features:
+        if col in label_encoders:
+            schema[col] = {"categories": list(label_encoders[col].classes_)}
+        else:
+            schema[col] = {"range": numeric_limits.get(col, (-np.inf, np.inf))}
+    return schema
+
+
+def _invalid_categories(values, categories):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Check each distinct category once, then broadcast through the codes
+        valid = np.append(values.cat.categories.isin(categories), False)  # code -1 (NaN) -> invalid
+        return ~valid[values.cat.codes.to_numpy()]
+    return ~values.isin(categories).to_numpy()
+
+
+def _invalid_range(values, low, high):
+    numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        # NaN (missing or non-numeric) fails both comparisons, so it is invalid
+        return ~((numeric >= low) & (numeric <= high))
+
+
+def validate_frame(df, schema):
+    """Boolean error mask (True = invalid) per schema column for every row."""
+    masks = {}
+    for col, rule in schema.items():
+        if col not in df:
+            masks[col] = np.ones(len(df), dtype=bool)
+        elif "categories" in rule:
+            masks[col] = _invalid_categories(df[col], rule["categories"])
+        else:
+            masks[col] = _invalid_range(df[col], *rule["range"])
+    return pd.DataFrame(masks, index=df.index)
+
+
+def row_errors(mask):
+    """Semicolon-separated invalid column names for each row with an error."""
+    bad = mask[mask.any(axis=1)]
+    return bad.dot(bad.columns + ";").str.rstrip(";")
+
+
+def validate_csv(path, schema, chunksize=500_000):
+    """Yield (chunk, mask) over a CSV read in chunks.
+
+    Categorical columns are read as pandas categoricals so each distinct
+    value is looked up once per chunk.
+    """
+    dtypes = {col: "category" for col, rule in schema.items() if "categories" in rule}
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtypes):
+        yield chunk, validate_frame(chunk, schema)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a batch CSV against the deployed encoders")
+    parser.add_argument("path", help="CSV of raw survey rows")
+    parser.add_argument("--pipeline", choices=["onehot", "label"], default="onehot")
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--errors-out", help="Write invalid rows with an 'errors' column to this CSV")
+    args = parser.parse_args()
+
+    if args.pipeline == "onehot":
+        _, preprocessor = pipelines.load_onehot_bundle()
+        schema = schema_from_preprocessor(preprocessor)
+    else:
+        label_encoders, model_features = pipelines.load_label_encoding()
+        schema = schema_from_label_encoders(label_encoders, model_features)
+
+    rows = bad_rows = 0
+    column_errors = pd.Series(0, index=list(schema), dtype="int64")
+    header = True
+    for chunk, mask in validate_csv(args.path, schema, args.chunksize):
+        rows += len(chunk)
+        bad_rows += int(mask.any(axis=1).sum())
+        column_errors += mask.sum()
+        if args.errors_out:
+            errors = row_errors(mask)
+            if len(errors):
+                chunk.loc[errors.index].assign(errors=errors).to_csv(
+                    args.errors_out, mode="w" if header else "a", header=header, index=False)
+                header = False
+
+    print(json.dumps({
+        "rows": rows,
+        "invalid_rows": bad_rows,
+        "invalid_by_column": {col: int(n) for col, n in column_errors.items() if n},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()